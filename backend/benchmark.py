@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark against the configured database.
+
+Drives the FastAPI app in-process through TestClient, so latencies include
+the ASGI stack but no network. For each scenario it records latency
+percentiles, SQL statements per request and peak Python memory, and writes
+a JSON report that a later run can be compared against. Request targets are
+drawn from a seeded RNG over the ids actually in the database, so runs on
+the same data are repeatable. Load data first with generate_data.py.
+TestClient needs httpx, which is in requirements-dev.txt:
+
+    pip install -r requirements-dev.txt
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+    python benchmark.py --only items_page,item_by_id --requests 500
+
+Write scenarios (invoice creation and payments) change the data; they run
+last and can be skipped with --read-only.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+
+import database, models
+
+class Targets:
+    """Id ranges and dates that request paths are drawn from"""
+
+    def __init__(self, engine, seed: int):
+        self.rng = random.Random(seed)
+        with engine.connect() as conn:
+            self.item_ids = conn.execute(select(models.Item.id)).scalars().all()
+            self.customer_ids = conn.execute(
+                select(models.Customer.id).where(models.Customer.customer_type == "regular")
+            ).scalars().all()
+            self.invoice_ids = conn.execute(select(models.Invoice.id)).scalars().all()
+            first, last = conn.execute(select(func.min(models.Invoice.created_at), func.max(models.Invoice.created_at))).one()
+        if not (self.item_ids and self.customer_ids and self.invoice_ids):
+            sys.exit("The database needs items, customers and invoices; run generate_data.py first.")
+        self.first_day = first.date() if hasattr(first, "date") else datetime.fromisoformat(str(first)).date()
+        self.last_day = last.date() if hasattr(last, "date") else datetime.fromisoformat(str(last)).date()
+
+    def item(self):
+        return self.rng.choice(self.item_ids)
+
+    def customer(self):
+        return self.rng.choice(self.customer_ids)
+
+    def invoice(self):
+        return self.rng.choice(self.invoice_ids)
+
+    def day(self):
+        span = (self.last_day - self.first_day).days
+        return self.first_day + timedelta(days=self.rng.randint(0, max(span, 0)))
+
+    def month(self):
+        start = self.day().replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return start.isoformat(), end.isoformat()
+
+def _create_invoice(t: Targets):
+    customer = t.customer()
+    lines = [{"productId": t.item(), "quantity": 1} for _ in range(t.rng.randint(1, 4))]
+    return "/invoices", {"lines": lines, "customer_id": customer, "client_name": f"Customer {customer}",
+                         "total_amount": 0, "amount_paid": 0, "outstanding_balance": 0, "payment_status": "unpaid"}
+
+def _customer_payment(t: Targets):
+    customer = t.customer()
+    return f"/customers/{customer}/payment", {"customer_id": customer, "payment_amount": 100.0}
+
+def _sales_month(t: Targets):
+    start, end = t.month()
+    return f"/sales-tracker?group_by=day&group_by=category&start={start}&end={end}", None
+
+def _sales_week(t: Targets):
+    day = t.day()
+    return f"/sales-tracker?start={day.isoformat()}&end={(day + timedelta(days=6)).isoformat()}", None
+
+# name -> (method, request factory returning (path, json body), writes)
+SCENARIOS = {
+    "items_page": ("GET", lambda t: (f"/items?limit=100&after={t.item()}", None), False),
+    "item_by_id": ("GET", lambda t: (f"/items/{t.item()}", None), False),
+    "items_not_modified": ("GET", lambda t: ("/items?limit=100", None), False),
+    "invoices_page": ("GET", lambda t: ("/invoices?limit=50&compact=true", None), False),
+    "invoices_by_customer": ("GET", lambda t: (f"/invoices?customer_id={t.customer()}&limit=50", None), False),
+    "invoices_by_date": ("GET", lambda t: (f"/invoices/by-date?date={t.day().isoformat()}&compact=true", None), False),
+    "sales_tracker_month": ("GET", _sales_month, False),
+    "sales_tracker_week_raw": ("GET", _sales_week, False),
+    "customer_balance": ("GET", lambda t: (f"/customers/{t.customer()}/outstanding-balance", None), False),
+    "customer_balances": ("GET", lambda t: ("/customers/balances", None), False),
+    "customer_payments": ("GET", lambda t: (f"/customers/{t.customer()}/payments", None), False),
+    "dashboard_summary": ("GET", lambda t: ("/dashboard/summary", None), False),
+    "create_invoice": ("POST", _create_invoice, True),
+    "invoice_payment": ("PUT", lambda t: (f"/invoices/{t.invoice()}/payment", {"amount_paid": t.rng.randint(0, 5000)}), True),
+    "customer_payment": ("POST", _customer_payment, True),
+}
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        engines = [database.engine] + ([database.async_engine.sync_engine] if database.async_engine is not None else [])
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def run_scenario(client, counter: QueryCounter, targets: Targets, name: str, requests: int, warmup: int, memory_requests: int) -> dict:
+    method, make_request, _ = SCENARIOS[name]
+    headers = {}
+
+    def call():
+        path, body = make_request(targets)
+        return client.request(method, path, json=body, headers=headers)
+
+    response = call()
+    for _ in range(warmup):
+        call()
+    if name == "items_not_modified":
+        headers["If-None-Match"] = response.headers.get("etag", "")
+
+    latencies, queries, sizes, statuses = [], [], [], {}
+    for _ in range(requests):
+        before = counter.count
+        started = time.perf_counter()
+        response = call()
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count - before)
+        # Bytes as sent, before the client undoes any Content-Encoding
+        sizes.append(response.num_bytes_downloaded)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    # Memory is measured separately; tracemalloc would distort the timings
+    tracemalloc.start()
+    for _ in range(memory_requests):
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "status": statuses,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p90": round(_percentile(latencies, 90), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+            "mean": round(statistics.fmean(latencies), 3),
+        },
+        "queries_per_request": {"mean": round(statistics.fmean(queries), 2), "max": max(queries)},
+        "response_bytes": {"mean": round(statistics.fmean(sizes)), "max": max(sizes)},
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _row_counts(engine) -> dict:
+    with engine.connect() as conn:
+        return {
+            model.__tablename__: conn.execute(select(func.count()).select_from(model)).scalar()
+            for model in (models.Item, models.Customer, models.Invoice, models.InvoiceItem, models.Payment)
+        }
+
+def compare(report: dict, baseline: dict):
+    print(f"\n{'scenario':28} {'p50 ms':>20} {'p99 ms':>20} {'queries':>12} {'bytes':>20}")
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            print(f"{name:28} {'(new)':>20}")
+            continue
+        cells = []
+        for key in ("p50", "p99"):
+            before, after = old["latency_ms"][key], result["latency_ms"][key]
+            change = (after - before) / before * 100 if before else 0.0
+            cells.append(f"{before:.1f} -> {after:.1f} {change:+.0f}%")
+        queries = f"{old['queries_per_request']['mean']:g} -> {result['queries_per_request']['mean']:g}"
+        # Reports from before response sizes were recorded have none
+        size = f"{old.get('response_bytes', {}).get('mean', '?')} -> {result['response_bytes']['mean']}"
+        print(f"{name:28} {cells[0]:>20} {cells[1]:>20} {queries:>12} {size:>20}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against the configured database")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--memory-requests", type=int, default=20, help="requests per scenario traced for peak memory")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--read-only", action="store_true", help="skip scenarios that write")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+    if args.read_only:
+        names = [name for name in names if not SCENARIOS[name][2]]
+    # Writes go last so they do not change what the read scenarios see
+    names.sort(key=lambda name: SCENARIOS[name][2])
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    targets = Targets(database.engine, args.seed)
+    counter = QueryCounter()
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "dialect": database.engine.dialect.name,
+            "async": database.USE_ASYNC,
+            "python": platform.python_version(),
+            "rows": _row_counts(database.engine),
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+    with TestClient(app_module.app) as client:
+        for name in names:
+            result = run_scenario(client, counter, targets, name, args.requests, args.warmup, args.memory_requests)
+            report["scenarios"][name] = result
+            latency = result["latency_ms"]
+            print(f"{name:28} p50 {latency['p50']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+                  f"{result['queries_per_request']['mean']:5.1f} queries  {result['response_bytes']['mean']:9d} B  "
+                  f"{result['peak_memory_kb']:9.1f} KB  {result['status']}")
+
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+In-process cache of item snapshots, looked up by id or product_code.
+
+Entries are immutable schemas.ItemResponse snapshots rather than ORM
+objects, so they can be shared across sessions and threads. crud queues
+invalidations for item writes and stock decrements with invalidate_on_commit;
+they are applied only after the session's transaction commits, and dropped
+if it rolls back. Other worker processes do not see those invalidations, so ITEM_CACHE_TTL
+bounds how stale an entry can get.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class TTLCache:
+    """Bounded LRU mapping whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class ItemCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.by_id = TTLCache(maxsize, ttl)
+        self.code_to_id = TTLCache(maxsize, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, snapshot):
+        with self.by_id._lock:
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return snapshot
+
+    def get(self, item_id: int):
+        return self._count(self.by_id.get(item_id))
+
+    def get_by_code(self, product_code: str):
+        item_id = self.code_to_id.get(product_code)
+        snapshot = self.by_id.get(item_id) if item_id is not None else None
+        # The code may have been reassigned since the mapping was cached
+        if snapshot is not None and snapshot.product_code != product_code:
+            snapshot = None
+        return self._count(snapshot)
+
+    def put(self, snapshot):
+        self.by_id.set(snapshot.id, snapshot)
+        self.code_to_id.set(snapshot.product_code, snapshot.id)
+        return snapshot
+
+    def invalidate(self, item_ids: Iterable[int] = (), product_codes: Iterable[Optional[str]] = ()):
+        for item_id in item_ids:
+            self.by_id.pop(item_id)
+        for product_code in product_codes:
+            if product_code is not None:
+                self.code_to_id.pop(product_code)
+
+    def clear(self):
+        self.by_id.clear()
+        self.code_to_id.clear()
+
+    def stats(self) -> dict:
+        with self.by_id._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "size": len(self.by_id),
+            "maxsize": self.by_id.maxsize,
+            "ttl_seconds": self.by_id.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+items = ItemCache(
+    maxsize=int(os.getenv("ITEM_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("ITEM_CACHE_TTL", "60")),
+)
+
+def invalidate_on_commit(session: Session, item_ids: Iterable[int] = (), product_codes: Iterable[Optional[str]] = ()):
+    """Invalidate these entries once `session` commits; dropped if it rolls back"""
+    pending_ids, pending_codes = session.info.setdefault("catalog_cache_pending", (set(), set()))
+    pending_ids.update(item_ids)
+    pending_codes.update(product_codes)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    pending = session.info.pop("catalog_cache_pending", None)
+    if pending is not None:
+        items.invalidate(*pending)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop("catalog_cache_pending", None)
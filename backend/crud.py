@@ -1,17 +1,73 @@
 from sqlalchemy.orm import Session
-import models, schemas
-from typing import List, Optional
+import models, schemas, catalog_cache
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
 from sqlalchemy import func
 
-def get_items(db: Session) -> List[models.Item]:
-    return db.query(models.Item).all()
+def bump_table_version(db: Session, *tables: str):
+    """Advance the version stamp of each table in the caller's transaction"""
+    from models import TableVersion
+    insert = _dialect_insert(db)
+    for table in tables:
+        stmt = insert(TableVersion).values(table_name=table, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TableVersion.table_name],
+            set_={"version": TableVersion.version + 1}
+        )
+        db.execute(stmt)
+
+def get_table_versions(db: Session, tables) -> dict:
+    """Version stamps of several tables in one query, as {table: version}; 0 until a table's first tracked write"""
+    from models import TableVersion
+    rows = db.query(TableVersion.table_name, TableVersion.version).filter(TableVersion.table_name.in_(tables)).all()
+    return {table: 0 for table in tables} | dict(rows)
+
+def get_items(
+    db: Session,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    category: Optional[str] = None,
+    low_stock: Optional[int] = None,
+    name_prefix: Optional[str] = None,
+) -> List[models.Item]:
+    """List items in id order, resuming after the `after` id when paging"""
+    query = db.query(models.Item)
+    if category is not None:
+        query = query.filter(models.Item.category == category)
+    if low_stock is not None:
+        query = query.filter(models.Item.quantity <= low_stock)
+    if name_prefix:
+        query = query.filter(models.Item.name.istartswith(name_prefix, autoescape=True))
+    if after is not None:
+        query = query.filter(models.Item.id > after)
+    query = query.order_by(models.Item.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
 def get_item(db: Session, item_id: int) -> Optional[models.Item]:
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
+def get_item_snapshot(db: Session, item_id: int) -> Optional[schemas.ItemResponse]:
+    """Read-only item lookup served from the catalog cache when possible"""
+    cached = catalog_cache.items.get(item_id)
+    if cached is not None:
+        return cached
+    item = get_item(db, item_id)
+    return catalog_cache.items.put(schemas.ItemResponse.model_validate(item)) if item else None
+
+def get_item_by_code(db: Session, product_code: str) -> Optional[schemas.ItemResponse]:
+    """Read-only lookup by product_code, served from the catalog cache when possible"""
+    cached = catalog_cache.items.get_by_code(product_code)
+    if cached is not None:
+        return cached
+    item = db.query(models.Item).filter(models.Item.product_code == product_code).first()
+    return catalog_cache.items.put(schemas.ItemResponse.model_validate(item)) if item else None
+
 def create_item(db: Session, item: schemas.ItemCreate, image_filename: Optional[str] = None) -> models.Item:
     db_item = models.Item(**item.dict(), image_filename=image_filename)
     db.add(db_item)
+    bump_table_version(db, "items")
     db.commit()
     db.refresh(db_item)
     return db_item
@@ -20,24 +76,167 @@ def update_item(db: Session, item_id: int, item_update: schemas.ItemUpdate, imag
     db_item = get_item(db, item_id)
     if not db_item:
         return None
+    old_code = db_item.product_code
     for field, value in item_update.dict(exclude_unset=True).items():
         setattr(db_item, field, value)
     if image_filename is not None:
         db_item.image_filename = image_filename
+    bump_table_version(db, "items")
+    catalog_cache.invalidate_on_commit(db, [item_id], [old_code])
     db.commit()
     db.refresh(db_item)
-    return db_item 
+    return db_item
+
+def upsert_items(db: Session, items: List[schemas.ItemCreate]) -> dict:
+    """Insert or update a batch of items by product_code with one batched upsert and one commit.
+
+    A code repeated within the batch keeps its last row. Images and
+    created_at of existing items are left alone. Returns created/updated counts.
+    """
+    from models import Item
+    by_code = {item.product_code: item for item in items}
+    if not by_code:
+        return {"created": 0, "updated": 0}
+    try:
+        existing = dict(db.query(Item.product_code, Item.id).filter(Item.product_code.in_(list(by_code))).all())
+        now = datetime.utcnow()
+        insert = _dialect_insert(db)
+        stmt = insert(Item)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Item.product_code],
+            set_={
+                field: stmt.excluded[field]
+                for field in ("name", "price", "purchase_price", "category", "quantity", "updated_at")
+            }
+        )
+        # executemany keeps the compiled statement cached; the driver batches the rows
+        db.execute(stmt, [{**item.dict(), "created_at": now, "updated_at": now} for item in by_code.values()])
+        bump_table_version(db, "items")
+        catalog_cache.invalidate_on_commit(db, existing.values(), existing.keys())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"created": len(by_code) - len(existing), "updated": len(existing)}
 
 # Customer CRUD operations
-def get_customers(db: Session) -> List[models.Customer]:
-    return db.query(models.Customer).filter(models.Customer.customer_type == "regular").all()
+def get_customers(
+    db: Session,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    name_prefix: Optional[str] = None,
+) -> List[models.Customer]:
+    """List regular customers in id order, resuming after the `after` id when paging"""
+    query = db.query(models.Customer).filter(models.Customer.customer_type == "regular")
+    if name_prefix:
+        query = query.filter(models.Customer.name.istartswith(name_prefix, autoescape=True))
+    if after is not None:
+        query = query.filter(models.Customer.id > after)
+    query = query.order_by(models.Customer.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
 def get_customer(db: Session, customer_id: int) -> Optional[models.Customer]:
     return db.query(models.Customer).filter(models.Customer.id == customer_id).first()
 
+# Search
+# Share of the term's trigrams a fuzzy match must contain on SQLite; close to
+# pg_trgm's default word_similarity_threshold (0.6) used on Postgres
+FUZZY_MATCH_SHARE = 0.6
+# Fuzzy candidates fetched from FTS5 per requested result, before scoring
+FUZZY_CANDIDATES = 5
+
+def _escape_like(term: str) -> str:
+    return term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+def _trigrams(value: str) -> set:
+    """Trigrams of a string's lowercased substrings"""
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+def _word_trigrams(value: str) -> set:
+    """Trigrams of each word padded the way pg_trgm pads them, for similarity scoring"""
+    return {trigram for word in value.lower().split() for trigram in _trigrams(f"  {word} ")}
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def _search(db: Session, model, q: str, limit: int, filters: list) -> list:
+    """Rows of `model` matching `q` on its searched columns, best first.
+
+    Exact matches rank first, then prefix, then substring matches, then
+    fuzzy (trigram) matches by similarity; terms under three characters
+    match prefixes only. Postgres answers from its pg_trgm
+    indexes in one query. SQLite takes substring matches from the FTS5
+    table, then tops the result up with fuzzy candidates when it is short.
+    """
+    from sqlalchemy import case, column, literal, literal_column, or_, table
+    import search_index
+    fields = search_index.SEARCHED[model.__tablename__]
+    columns = [getattr(model, field) for field in fields]
+    escaped = _escape_like(q)
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # LIKE is already case-insensitive on SQLite and cheaper than lower()
+        exact = or_(*[c.like(escaped, escape="/") for c in columns])
+        starts = or_(*[c.like(f"{escaped}%", escape="/") for c in columns])
+        contains = or_(*[c.like(f"%{escaped}%", escape="/") for c in columns])
+    else:
+        exact = or_(*[func.lower(c) == q.lower() for c in columns])
+        starts = or_(*[c.ilike(f"{escaped}%", escape="/") for c in columns])
+        contains = or_(*[c.ilike(f"%{escaped}%", escape="/") for c in columns])
+    rank = case((exact, 0), (starts, 1), (contains, 2), else_=3)
+    query = db.query(model).filter(*filters)
+
+    if len(q) < 3:
+        # Trigram indexes cannot match terms shorter than one trigram; typeahead wants prefixes here anyway
+        return query.filter(starts).order_by(rank, model.id).limit(limit).all()
+    if dialect == "postgresql" and search_index.trigram_available(db):
+        similarity = func.greatest(*[func.word_similarity(q, c) for c in columns])
+        fuzzy = or_(*[literal(q).op("<%")(c) for c in columns])
+        return query.filter(or_(contains, fuzzy)).order_by(rank, similarity.desc(), model.id).limit(limit).all()
+    if dialect != "sqlite":
+        return query.filter(contains).order_by(rank, model.id).limit(limit).all()
+
+    fts_name = search_index.fts_table(model.__tablename__)
+    fts = table(fts_name, column("rowid"))
+    match = literal_column(fts_name).op("MATCH")
+    query = query.join(fts, fts.c.rowid == model.id)
+    # Every phrase match contains the term, so only exact and prefix matches need ranking
+    results = query.filter(match(_fts_phrase(q))).order_by(case((exact, 0), (starts, 1), else_=2), model.id).limit(limit).all()
+    if len(results) == limit:
+        return results
+
+    candidates = query.filter(match(" OR ".join(_fts_phrase(trigram) for trigram in sorted(_trigrams(q)))))
+    if results:
+        candidates = candidates.filter(model.id.notin_([row.id for row in results]))
+    candidates = candidates.order_by(func.bm25(literal_column(fts_name))).limit(limit * FUZZY_CANDIDATES).all()
+    wanted = _word_trigrams(q)
+    scored = []
+    for row in candidates:
+        share = max(len(wanted & _word_trigrams(getattr(row, field) or "")) for field in fields) / len(wanted)
+        if share >= FUZZY_MATCH_SHARE:
+            scored.append((share, row))
+    scored.sort(key=lambda pair: (-pair[0], pair[1].id))
+    return results + [row for _, row in scored[:limit - len(results)]]
+
+def search_items(db: Session, q: str, limit: int = 20, category: Optional[str] = None) -> List[models.Item]:
+    """Items whose product code, name or category match `q`, best matches first"""
+    filters = [models.Item.category == category] if category is not None else []
+    return _search(db, models.Item, q.strip(), limit, filters)
+
+def search_customers(db: Session, q: str, limit: int = 20) -> List[models.Customer]:
+    """Regular customers whose name, phone or email match `q`, best matches first"""
+    return _search(db, models.Customer, q.strip(), limit, [models.Customer.customer_type == "regular"])
+
 def create_customer(db: Session, customer: schemas.CustomerCreate) -> models.Customer:
     db_customer = models.Customer(**customer.dict())
     db.add(db_customer)
+    db.flush()
+    # Legacy invoices without customer_id are matched by name
+    _recompute_customer_balances(db, db_customer.id)
+    bump_table_version(db, "customers")
     db.commit()
     db.refresh(db_customer)
     return db_customer
@@ -46,8 +245,13 @@ def update_customer(db: Session, customer_id: int, customer_update: schemas.Cust
     db_customer = get_customer(db, customer_id)
     if not db_customer:
         return None
+    old_name = db_customer.name
     for field, value in customer_update.dict(exclude_unset=True).items():
         setattr(db_customer, field, value)
+    if db_customer.name != old_name:
+        db.flush()
+        _recompute_customer_balances(db, customer_id)
+    bump_table_version(db, "customers")
     db.commit()
     db.refresh(db_customer)
     return db_customer
@@ -57,71 +261,405 @@ def delete_customer(db: Session, customer_id: int) -> bool:
     if not db_customer:
         return False
     db.delete(db_customer)
+    bump_table_version(db, "customers")
     db.commit()
     return True
 
-def create_invoice(db: Session, invoice_data: 'schemas.InvoiceCreate'):
-    from models import Invoice, InvoiceItem, Item
-    invoice = Invoice(
-        customer_id=invoice_data.customer_id,
-        client_name=invoice_data.client_name,
-        client_phone=invoice_data.client_phone,
-        # Add payment tracking fields
-        total_amount=invoice_data.total_amount,
-        amount_paid=invoice_data.amount_paid or 0.0,
-        outstanding_balance=invoice_data.outstanding_balance,
-        payment_status=invoice_data.payment_status or "unpaid"
+def _adjust_customer_balance(db: Session, customer_id: Optional[int], client_name: Optional[str], delta: float):
+    """Apply an invoice's outstanding balance change to its customer's stored balance.
+
+    Invoices without a customer_id belong to every customer with a matching
+    name, mirroring how legacy invoices have always been attributed.
+    """
+    from models import Customer
+    from sqlalchemy import update
+    if not delta:
+        return
+    owner = Customer.id == customer_id if customer_id is not None else Customer.name == client_name
+    db.execute(
+        update(Customer)
+        .where(owner)
+        .values(outstanding_balance=Customer.outstanding_balance + delta, updated_at=Customer.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def _recompute_customer_balances(db: Session, customer_id: Optional[int] = None) -> int:
+    """Recompute stored balances from invoices, for one customer or all of them"""
+    from models import Invoice, Customer
+    from sqlalchemy import select, update
+
+    by_id = (
+        select(func.coalesce(func.sum(Invoice.outstanding_balance), 0))
+        .where(Invoice.customer_id == Customer.id)
+        .scalar_subquery()
+    )
+    by_name = (
+        select(func.coalesce(func.sum(Invoice.outstanding_balance), 0))
+        .where(Invoice.customer_id.is_(None), Invoice.client_name == Customer.name)
+        .scalar_subquery()
     )
-    db.add(invoice)
-    db.flush()  # Get invoice.id
-    for line in invoice_data.lines:
-        item = db.query(Item).filter(Item.id == line.productId).first()
-        if not item or item.quantity < line.quantity:
-            raise ValueError(f"Not enough stock for item {line.productId}")
-        item.quantity -= line.quantity
-        db.add(InvoiceItem(invoice_id=invoice.id, item_id=item.id, quantity=line.quantity, price=item.price))
+    stmt = update(Customer).values(outstanding_balance=by_id + by_name, updated_at=Customer.updated_at)
+    if customer_id is not None:
+        stmt = stmt.where(Customer.id == customer_id)
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+def reconcile_customer_balances(db: Session) -> int:
+    """Rebuild every customer's stored balance from their invoices"""
+    updated = _recompute_customer_balances(db)
     db.commit()
-    db.refresh(invoice)
-    return invoice 
+    return updated
+
+def _dialect_insert(db: Session):
+    """Dialect-specific insert() construct, for ON CONFLICT upserts"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+def _add_to_daily_sales(db: Session, sale_date, rollup: dict):
+    """Add an invoice's totals to the daily sales rollup in the caller's transaction"""
+    from models import DailySalesSummary
+    if not rollup:
+        return
+    insert = _dialect_insert(db)
+    stmt = insert(DailySalesSummary).values([
+        {"sale_date": sale_date, "item_id": item_id, "category": category, "quantity": quantity, "revenue": revenue, "cost": cost}
+        for (item_id, category), (quantity, revenue, cost) in rollup.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySalesSummary.sale_date, DailySalesSummary.item_id, DailySalesSummary.category],
+        set_={
+            "quantity": DailySalesSummary.quantity + stmt.excluded.quantity,
+            "revenue": DailySalesSummary.revenue + stmt.excluded.revenue,
+            "cost": DailySalesSummary.cost + stmt.excluded.cost,
+        }
+    )
+    db.execute(stmt)
+
+def rebuild_daily_sales_summary(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+    """Recompute the daily sales rollup from invoice lines, optionally for [start, end) only.
+
+    Lines are grouped by the category, price and cost recorded on them at
+    time of sale, so a rebuild matches what create_invoices accumulated.
+    """
+    from models import Invoice, InvoiceItem, DailySalesSummary
+    from sqlalchemy import insert, select
+
+    delete_query = db.query(DailySalesSummary)
+    if start is not None:
+        delete_query = delete_query.filter(DailySalesSummary.sale_date >= start.date())
+    if end is not None:
+        delete_query = delete_query.filter(DailySalesSummary.sale_date < end.date())
+    delete_query.delete(synchronize_session=False)
+
+    day = func.date(Invoice.created_at)
+    source = (
+        select(
+            day,
+            InvoiceItem.item_id,
+            InvoiceItem.category,
+            func.sum(InvoiceItem.quantity),
+            func.sum(InvoiceItem.quantity * func.coalesce(InvoiceItem.price, 0)),
+            func.sum(InvoiceItem.quantity * func.coalesce(InvoiceItem.purchase_price, 0))
+        )
+        .select_from(Invoice)
+        .join(InvoiceItem, Invoice.id == InvoiceItem.invoice_id)
+        .group_by(day, InvoiceItem.item_id, InvoiceItem.category)
+    )
+    if start is not None:
+        source = source.where(Invoice.created_at >= start)
+    if end is not None:
+        source = source.where(Invoice.created_at < end)
+    result = db.execute(
+        insert(DailySalesSummary).from_select(
+            ["sale_date", "item_id", "category", "quantity", "revenue", "cost"], source
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+def _reserve_stock(db: Session, invoice_lines: List[list]) -> Tuple[dict, List[Optional[str]]]:
+    """Lock and decrement stock for a batch of invoices at once.
+
+    Every item in the batch is locked in id order, so concurrent batches
+    cannot deadlock. Invoices are then accepted in order while stock lasts;
+    one that would overdraw an item is rejected whole. The decrement for all
+    accepted invoices is a single conditional UPDATE so stock can never go
+    negative. Returns ({item_id: row}, [error or None per invoice]).
+    """
+    from models import Item
+    from sqlalchemy import case, update
+
+    item_ids = {line.productId for lines in invoice_lines for line in lines}
+    if not item_ids:
+        return {}, [None] * len(invoice_lines)
+
+    rows = (
+        db.query(Item.id, Item.price, Item.purchase_price, Item.category, Item.quantity)
+        .filter(Item.id.in_(item_ids))
+        .order_by(Item.id)
+        .with_for_update()
+        .all()
+    )
+    stock = {row.id: row for row in rows}
+    available = {row.id: row.quantity for row in rows}
+    taken = {}
+    errors = []
+    for lines in invoice_lines:
+        # Quantities for repeated productIds are summed first
+        needed = {}
+        for line in lines:
+            needed[line.productId] = needed.get(line.productId, 0) + line.quantity
+        short = next((item_id for item_id, quantity in needed.items() if available.get(item_id, 0) < quantity), None)
+        if short is not None:
+            errors.append(f"Not enough stock for item {short}")
+            continue
+        for item_id, quantity in needed.items():
+            available[item_id] -= quantity
+            taken[item_id] = taken.get(item_id, 0) + quantity
+        errors.append(None)
+
+    if taken:
+        requested = case(taken, value=Item.id)
+        result = db.execute(
+            update(Item)
+            .where(Item.id.in_(taken), Item.quantity >= requested)
+            .values(quantity=Item.quantity - requested)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(taken):
+            raise ValueError("Not enough stock for one or more items")
+    return stock, errors
+
+def create_invoices(db: Session, invoices: List[schemas.InvoiceCreate], _retry: bool = True) -> List[dict]:
+    """Create a batch of invoices in one transaction.
+
+    Invoices whose idempotency_key was already used are not applied again
+    and report the original invoice instead, as do repeats within the batch.
+    An invoice short of stock is rejected without affecting the others.
+    Returns one {status, invoice_id, error} dict per input, in order;
+    status is "created", "duplicate" or "failed".
+    """
+    from models import Invoice, InvoiceItem
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+
+    keys = {data.idempotency_key for data in invoices if data.idempotency_key}
+    existing = {}
+    if keys:
+        existing = dict(db.query(Invoice.idempotency_key, Invoice.id).filter(Invoice.idempotency_key.in_(keys)).all())
+
+    results = [None] * len(invoices)
+    first_use = {}  # idempotency_key -> index of its first invoice in this batch
+    fresh = []
+    for index, data in enumerate(invoices):
+        key = data.idempotency_key
+        if key in existing:
+            results[index] = {"status": "duplicate", "invoice_id": existing[key], "error": None}
+        elif key is None or key not in first_use:
+            if key is not None:
+                first_use[key] = index
+            fresh.append((index, data))
+
+    try:
+        stock, errors = _reserve_stock(db, [data.lines for _, data in fresh])
+    except ValueError:
+        db.rollback()
+        raise
+
+    now = datetime.utcnow()
+    created = []
+    for (index, data), error in zip(fresh, errors):
+        if error is not None:
+            results[index] = {"status": "failed", "invoice_id": None, "error": error}
+            continue
+        created.append((index, data, Invoice(
+            created_at=now,
+            customer_id=data.customer_id,
+            client_name=data.client_name,
+            client_phone=data.client_phone,
+            total_amount=data.total_amount,
+            amount_paid=data.amount_paid or 0.0,
+            outstanding_balance=data.outstanding_balance,
+            payment_status=data.payment_status or "unpaid",
+            idempotency_key=data.idempotency_key,
+        )))
+    db.add_all([invoice for _, _, invoice in created])
+    try:
+        db.flush()  # Get invoice ids
+    except IntegrityError:
+        # A concurrent request used one of the keys first; its invoice is now visible
+        db.rollback()
+        if _retry:
+            return create_invoices(db, invoices, _retry=False)
+        raise
+
+    line_rows = []
+    rollup = {}  # (item_id, category) -> (quantity, revenue, cost)
+    balances = {}  # (customer_id, client_name) -> outstanding delta
+    for index, data, invoice in created:
+        for line in data.lines:
+            item = stock[line.productId]
+            line_rows.append({
+                "invoice_id": invoice.id, "item_id": item.id, "quantity": line.quantity,
+                "price": item.price, "purchase_price": item.purchase_price, "category": item.category,
+            })
+            key = (item.id, item.category)
+            quantity, revenue, cost = rollup.get(key, (0, 0.0, 0.0))
+            rollup[key] = (quantity + line.quantity, revenue + line.quantity * item.price, cost + line.quantity * item.purchase_price)
+        owner = (invoice.customer_id, invoice.client_name)
+        balances[owner] = balances.get(owner, 0.0) + (invoice.outstanding_balance or 0.0)
+        results[index] = {"status": "created", "invoice_id": invoice.id, "error": None}
+    if line_rows:
+        db.execute(insert(InvoiceItem), line_rows)
+    _add_to_daily_sales(db, now.date(), rollup)
+    for (customer_id, client_name), delta in balances.items():
+        _adjust_customer_balance(db, customer_id, client_name, delta)
+    if created:
+        bump_table_version(db, "items", "invoices")
+    catalog_cache.invalidate_on_commit(db, stock)
+    db.commit()
+
+    for index, data in enumerate(invoices):
+        if results[index] is None:  # Repeat of a key earlier in this batch
+            results[index] = {**results[first_use[data.idempotency_key]]}
+            if results[index]["status"] == "created":
+                results[index]["status"] = "duplicate"
+    return results
+
+def create_invoice(db: Session, invoice_data: 'schemas.InvoiceCreate'):
+    from models import Invoice
+    result = create_invoices(db, [invoice_data])[0]
+    if result["status"] == "failed":
+        raise ValueError(result["error"])
+    return db.get(Invoice, result["invoice_id"])
+
+def invoice_load_options(compact: bool = False) -> list:
+    """Loader options for invoice queries.
+
+    Lines and their items are fetched with selectin (one IN query per level)
+    instead of joins. In compact mode only the item name and code are loaded
+    and touching any other item column or the customer raises instead of
+    issuing a lazy query.
+    """
+    from models import Invoice, InvoiceItem, Item
+    from sqlalchemy.orm import selectinload, raiseload
+
+    item_loader = selectinload(Invoice.items).selectinload(InvoiceItem.item)
+    if compact:
+        item_loader = item_loader.load_only(Item.name, Item.product_code, raiseload=True)
+    return [item_loader, raiseload(Invoice.customer)]
+
+def get_invoices(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    customer_id: Optional[int] = None,
+    payment_status: Optional[str] = None,
+    before: Optional[tuple] = None,
+    limit: Optional[int] = None,
+    compact: bool = False,
+):
+    """List invoices newest first, resuming below the (created_at, id) `before` cursor when paging"""
+    from models import Invoice
+    from sqlalchemy import or_, and_
+
+    query = db.query(Invoice).options(*invoice_load_options(compact))
+    if start is not None:
+        query = query.filter(Invoice.created_at >= start)
+    if end is not None:
+        query = query.filter(Invoice.created_at < end)
+    if customer_id is not None:
+        query = query.filter(Invoice.customer_id == customer_id)
+    if payment_status is not None:
+        query = query.filter(Invoice.payment_status == payment_status)
+    if before is not None:
+        created_at, invoice_id = before
+        query = query.filter(or_(
+            Invoice.created_at < created_at,
+            and_(Invoice.created_at == created_at, Invoice.id < invoice_id)
+        ))
+    query = query.order_by(Invoice.created_at.desc(), Invoice.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+INVOICE_EXPORT_FIELDS = [
+    "invoice_id", "created_at", "customer_id", "client_name", "client_phone",
+    "total_amount", "amount_paid", "outstanding_balance", "payment_status",
+]
+INVOICE_LINE_EXPORT_FIELDS = INVOICE_EXPORT_FIELDS + [
+    "line_id", "item_id", "product_code", "product_name", "category", "quantity", "price", "purchase_price", "line_total",
+]
+
+def invoice_export_query(start: Optional[datetime] = None, end: Optional[datetime] = None, lines: bool = True):
+    """Flat rows for the invoice export, oldest first: one per invoice line, or one per invoice.
+
+    Returns a Core select so the caller can stream it with yield_per on
+    either session flavour. Invoices without lines still get one row.
+    Category and purchase price are the line's snapshots from the time of sale.
+    """
+    from models import Invoice, InvoiceItem, Item
+    from sqlalchemy import select
+
+    columns = [
+        Invoice.id.label("invoice_id"), Invoice.created_at, Invoice.customer_id, Invoice.client_name,
+        Invoice.client_phone, Invoice.total_amount, Invoice.amount_paid, Invoice.outstanding_balance,
+        Invoice.payment_status,
+    ]
+    order = [Invoice.created_at, Invoice.id]
+    if lines:
+        columns += [
+            InvoiceItem.id.label("line_id"), InvoiceItem.item_id, Item.product_code, Item.name.label("product_name"),
+            InvoiceItem.category, InvoiceItem.quantity, InvoiceItem.price, InvoiceItem.purchase_price,
+            (InvoiceItem.quantity * InvoiceItem.price).label("line_total"),
+        ]
+        order.append(InvoiceItem.id)
+    stmt = select(*columns).select_from(Invoice)
+    if lines:
+        stmt = (
+            stmt.outerjoin(InvoiceItem, InvoiceItem.invoice_id == Invoice.id)
+            .outerjoin(Item, Item.id == InvoiceItem.item_id)
+        )
+    if start is not None:
+        stmt = stmt.where(Invoice.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Invoice.created_at < end)
+    return stmt.order_by(*order)
 
 def get_customer_outstanding_balance(db: Session, customer_id: int) -> float:
-    """Calculate total outstanding balance for a customer"""
-    from models import Invoice, Customer
-    
-    # Get customer details
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not customer:
-        return 0.0
-    
-    # Sum outstanding balance from invoices with matching customer_id
-    result_by_id = db.query(
-        func.sum(func.coalesce(Invoice.outstanding_balance, 0))
-    ).filter(
-        Invoice.customer_id == customer_id
-    ).scalar() or 0.0
-    
-    # Also sum outstanding balance from invoices with matching client_name (for legacy invoices without customer_id)
-    result_by_name = db.query(
-        func.sum(func.coalesce(Invoice.outstanding_balance, 0))
-    ).filter(
-        Invoice.client_name == customer.name,
-        Invoice.customer_id.is_(None)  # Only count invoices without customer_id to avoid double counting
-    ).scalar() or 0.0
-    
-    total_outstanding = result_by_id + result_by_name
-    
-    # Return the sum, but never return negative (customer doesn't owe negative money)
-    return max(0.0, total_outstanding)
+    """Return the stored outstanding balance for a customer"""
+    from models import Customer
+
+    balance = db.query(Customer.outstanding_balance).filter(Customer.id == customer_id).scalar()
+    # Never return negative (customer doesn't owe negative money)
+    return max(0.0, balance or 0.0)
+
+def get_customer_balances(db: Session):
+    """Outstanding balance of every regular customer in one query"""
+    from models import Customer
+
+    return (
+        db.query(Customer.id.label('customer_id'), Customer.outstanding_balance)
+        .filter(Customer.customer_type == "regular")
+        .order_by(Customer.id)
+        .all()
+    )
 
 def update_invoice_payment(db: Session, invoice_id: int, payment_update: schemas.PaymentUpdate):
     """Update invoice payment status"""
-    from models import Invoice
+    from models import Invoice, Payment
     
     # Get the invoice
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not invoice:
         return None
     
+    old_balance = invoice.outstanding_balance or 0.0
+    old_paid = invoice.amount_paid or 0.0
+
     # Update payment fields
     invoice.amount_paid = payment_update.amount_paid
     invoice.outstanding_balance = max(0, invoice.total_amount - payment_update.amount_paid)
@@ -133,76 +671,130 @@ def update_invoice_payment(db: Session, invoice_id: int, payment_update: schemas
         invoice.payment_status = "partial"
     else:
         invoice.payment_status = "unpaid"
-    
+
+    _adjust_customer_balance(db, invoice.customer_id, invoice.client_name, invoice.outstanding_balance - old_balance)
+    if payment_update.amount_paid != old_paid:
+        db.add(Payment(customer_id=invoice.customer_id, invoice_id=invoice.id, amount=payment_update.amount_paid - old_paid))
+    bump_table_version(db, "invoices")
     db.commit()
     db.refresh(invoice)
     return invoice
 
 def process_customer_payment(db: Session, customer_payment: schemas.CustomerPayment):
-    """Process payment for a customer across multiple unpaid invoices"""
-    from models import Invoice, Customer
+    """Process payment for a customer across multiple unpaid invoices.
+
+    The customer's open invoices are locked first, so the allocation works
+    on a fixed set of rows that concurrent writes cannot change. The payment
+    is allocated oldest invoice first with a running-sum window over those
+    invoices and recorded in the payments ledger; the invoices are then
+    updated from the rows the ledger INSERT returned, so both always agree.
+    """
+    from models import Invoice, Customer, Payment
+    from sqlalchemy import or_, and_, case, insert, literal, select, update, DateTime
     
-    # Get customer details
-    customer = db.query(Customer).filter(Customer.id == customer_payment.customer_id).first()
-    if not customer:
+    # Get customer details, locking the row so concurrent payments allocate one at a time
+    customer = db.query(Customer).filter(Customer.id == customer_payment.customer_id).with_for_update().first()
+    amount = float(customer_payment.payment_amount)
+    if not customer or amount <= 0:
         return {"updated_invoices": 0, "amount_applied": 0, "remaining_payment": customer_payment.payment_amount}
     
-    # Get all unpaid invoices for this customer, ordered by date (oldest first)
-    # Include both invoices with customer_id and legacy invoices with matching client_name
-    from sqlalchemy import or_, and_
-    unpaid_invoices = db.query(Invoice).filter(
-        or_(
-            Invoice.customer_id == customer_payment.customer_id,
-            and_(Invoice.client_name == customer.name, Invoice.customer_id.is_(None))
-        ),
-        Invoice.outstanding_balance > 0
-    ).order_by(Invoice.created_at.asc()).all()
-    
-    remaining_payment = float(customer_payment.payment_amount)
-    updated_invoices = []
-    
-    # Apply payment to invoices starting from oldest
-    for invoice in unpaid_invoices:
-        if remaining_payment <= 0:
-            break
-            
-        outstanding = float(invoice.outstanding_balance or 0)
-        if outstanding <= 0:
-            continue
-            
-        # Calculate how much to pay on this invoice
-        payment_for_this_invoice = min(remaining_payment, outstanding)
-        
-        # Update invoice payment
-        current_paid = float(invoice.amount_paid or 0)
-        new_paid_amount = current_paid + payment_for_this_invoice
-        
-        invoice.amount_paid = new_paid_amount
-        invoice.outstanding_balance = max(0, float(invoice.total_amount) - new_paid_amount)
-        
-        # Update payment status
-        if new_paid_amount >= float(invoice.total_amount):
-            invoice.payment_status = "paid"
-        elif new_paid_amount > 0:
-            invoice.payment_status = "partial"
-        else:
-            invoice.payment_status = "unpaid"
-            
-        updated_invoices.append(invoice)
-        remaining_payment -= payment_for_this_invoice
-    
+    # Lock this customer's unpaid invoices, including legacy invoices with a matching
+    # client_name. Postgres does not allow FOR UPDATE with the window below, hence two steps
+    locked = db.execute(
+        select(Invoice.id)
+        .where(
+            or_(
+                Invoice.customer_id == customer.id,
+                and_(Invoice.client_name == customer.name, Invoice.customer_id.is_(None))
+            ),
+            Invoice.outstanding_balance > 0
+        )
+        .order_by(Invoice.id)
+        .with_for_update()
+    ).scalars().all()
+    if not locked:
+        db.commit()
+        return {"updated_invoices": 0, "amount_applied": 0.0, "remaining_payment": amount}
+
+    # The locked invoices, oldest first, with the balance owed before each one
+    open_invoices = (
+        select(
+            Invoice.id,
+            Invoice.customer_id,
+            Invoice.outstanding_balance.label('outstanding'),
+            func.sum(Invoice.outstanding_balance).over(
+                order_by=(Invoice.created_at, Invoice.id), rows=(None, 0)
+            ).label('running')
+        )
+        .where(Invoice.id.in_(locked))
+        .subquery('open_invoices')
+    )
+    owed_before = open_invoices.c.running - open_invoices.c.outstanding
+    allocations = (
+        select(
+            open_invoices.c.id,
+            case(
+                (amount - owed_before >= open_invoices.c.outstanding, open_invoices.c.outstanding),
+                else_=amount - owed_before
+            ).label('amount')
+        )
+        .where(owed_before < amount)
+        .subquery('allocations')
+    )
+
+    ledger = db.execute(
+        insert(Payment)
+        .from_select(
+            ["customer_id", "invoice_id", "amount", "created_at"],
+            select(literal(customer.id), allocations.c.id, allocations.c.amount, literal(datetime.utcnow(), DateTime))
+        )
+        .returning(Payment.invoice_id, Payment.amount)
+    ).all()
+    applied = {row.invoice_id: row.amount for row in ledger}
+
+    if not applied:
+        db.commit()
+        return {"updated_invoices": 0, "amount_applied": 0.0, "remaining_payment": amount}
+
+    new_paid = func.coalesce(Invoice.amount_paid, 0) + case(applied, value=Invoice.id)
+    total = func.coalesce(Invoice.total_amount, 0)
+    updated = db.execute(
+        update(Invoice)
+        .where(Invoice.id.in_(applied))
+        .values(
+            amount_paid=new_paid,
+            outstanding_balance=case((total - new_paid > 0, total - new_paid), else_=0),
+            payment_status=case((new_paid >= total, "paid"), (new_paid > 0, "partial"), else_="unpaid")
+        )
+        .returning(Invoice.id, Invoice.customer_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    by_id = sum(applied[row.id] for row in updated if row.customer_id is not None)
+    by_name = sum(applied[row.id] for row in updated if row.customer_id is None)
+    _adjust_customer_balance(db, customer.id, None, -by_id)
+    _adjust_customer_balance(db, None, customer.name, -by_name)
+    bump_table_version(db, "invoices")
     db.commit()
     
-    # Refresh all updated invoices
-    for invoice in updated_invoices:
-        db.refresh(invoice)
-    
+    amount_applied = float(by_id + by_name)
     return {
-        "updated_invoices": len(updated_invoices),
-        "amount_applied": customer_payment.payment_amount - remaining_payment,
-        "remaining_payment": remaining_payment
+        "updated_invoices": len(updated),
+        "amount_applied": amount_applied,
+        "remaining_payment": amount - amount_applied
     }
 
+def get_payments(db: Session, customer_id: Optional[int] = None, invoice_id: Optional[int] = None):
+    """Payment allocation history, newest first"""
+    from models import Payment
+
+    query = db.query(Payment)
+    if customer_id is not None:
+        query = query.filter(Payment.customer_id == customer_id)
+    if invoice_id is not None:
+        query = query.filter(Payment.invoice_id == invoice_id)
+    return query.order_by(Payment.created_at.desc(), Payment.id.desc()).all()
+
 def assign_invoice_to_customer(db: Session, invoice_id: int, customer_assignment: schemas.InvoiceCustomerAssignment):
     """Assign an existing invoice to a customer"""
     from models import Invoice
@@ -211,24 +803,181 @@ def assign_invoice_to_customer(db: Session, invoice_id: int, customer_assignment
     if not invoice:
         return None
     
+    balance = invoice.outstanding_balance or 0.0
+    _adjust_customer_balance(db, invoice.customer_id, invoice.client_name, -balance)
     invoice.customer_id = customer_assignment.customer_id
+    _adjust_customer_balance(db, invoice.customer_id, invoice.client_name, balance)
+    bump_table_version(db, "invoices")
     db.commit()
     db.refresh(invoice)
     return invoice
 
-def get_sales_tracker(db: Session):
+SALES_GROUPINGS = ("day", "month", "category", "product")
+
+def _month_bucket(db: Session, column):
+    """Dialect-specific 'YYYY-MM' label for a timestamp column"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+def get_sales_tracker(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None):
     from models import Invoice, InvoiceItem, Item
-    results = (
+    query = (
         db.query(
             Invoice.created_at.label('date'),
             Item.name.label('product_name'),
-            Item.category.label('category'),
+            InvoiceItem.category.label('category'),
             InvoiceItem.quantity.label('quantity'),
             (InvoiceItem.quantity * func.coalesce(InvoiceItem.price, 0)).label('revenue')
         )
         .join(InvoiceItem, Invoice.id == InvoiceItem.invoice_id)
         .join(Item, InvoiceItem.item_id == Item.id)
-        .order_by(Invoice.created_at.desc())
+    )
+    if start is not None:
+        query = query.filter(Invoice.created_at >= start)
+    if end is not None:
+        query = query.filter(Invoice.created_at < end)
+    return query.order_by(Invoice.created_at.desc()).all()
+
+def get_sales_tracker_summary(db: Session, group_by: List[str], start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Aggregate sales into one row per bucket of the requested groupings.
+
+    Reads the daily_sales_summary rollup, so start/end are applied at day
+    granularity and categories are the ones recorded at time of sale.
+    """
+    from models import DailySalesSummary
+
+    day = DailySalesSummary.sale_date
+    return _sales_rollup_query(
+        db, group_by, start, end,
+        func.coalesce(func.sum(DailySalesSummary.quantity), 0).label('quantity'),
+        func.coalesce(func.sum(DailySalesSummary.revenue), 0).label('revenue'),
+        func.count(func.distinct(day)).label('active_days'),
+    ).all()
+
+def get_margin_report(db: Session, group_by: List[str], start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Revenue, cost and margin per bucket of the requested groupings.
+
+    Costs are the purchase prices snapshotted on each invoice line, so
+    margins stay correct after an item's cost changes. Everything is summed
+    in SQL from the daily_sales_summary rollup.
+    """
+    from models import DailySalesSummary
+
+    revenue = func.coalesce(func.sum(DailySalesSummary.revenue), 0)
+    cost = func.coalesce(func.sum(DailySalesSummary.cost), 0)
+    return _sales_rollup_query(
+        db, group_by, start, end,
+        func.coalesce(func.sum(DailySalesSummary.quantity), 0).label('quantity'),
+        revenue.label('revenue'),
+        cost.label('cost'),
+        (revenue - cost).label('margin'),
+        # NULL when nothing was charged, rather than a division by zero
+        (100.0 * (revenue - cost) / func.nullif(revenue, 0)).label('margin_percent'),
+    ).all()
+
+def _sales_rollup_query(db: Session, group_by: List[str], start: Optional[datetime], end: Optional[datetime], *measures):
+    """Query `measures` over daily_sales_summary, one row per bucket of `group_by`"""
+    from models import DailySalesSummary, Item
+
+    unknown = [g for g in group_by if g not in SALES_GROUPINGS]
+    if unknown:
+        raise ValueError(f"Invalid group_by: {', '.join(unknown)}. Use one of: {', '.join(SALES_GROUPINGS)}")
+
+    day = DailySalesSummary.sale_date
+    keys = []
+    if "day" in group_by:
+        keys.append(day.label('day'))
+    if "month" in group_by:
+        keys.append(_month_bucket(db, day).label('month'))
+    if "category" in group_by:
+        keys.append(DailySalesSummary.category.label('category'))
+    if "product" in group_by:
+        keys.extend([Item.id.label('item_id'), Item.name.label('product_name')])
+
+    query = db.query(*keys, *measures).select_from(DailySalesSummary)
+    if "product" in group_by:
+        query = query.join(Item, DailySalesSummary.item_id == Item.id)
+    if start is not None:
+        query = query.filter(day >= start.date())
+    if end is not None:
+        query = query.filter(day < end.date())
+    if keys:
+        query = query.group_by(*keys).order_by(*keys)
+    return query
+
+def get_dashboard_summary(db: Session, today: date, recent: int = 5, low_stock: int = 5, low_stock_items: int = 10) -> dict:
+    """Dashboard KPIs in four queries, none of which loads whole tables.
+
+    Sales totals come from the daily_sales_summary rollup: a sale_date range
+    scan summed per day, then one conditional sum per period. Stock figures
+    come from one aggregate pass over items. The latest invoices are read
+    newest-first from the (created_at, id) index.
+    """
+    from sqlalchemy import case
+    from models import DailySalesSummary, Invoice, Item
+
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    periods = {
+        "today": (today, today),
+        "yesterday": (today - timedelta(days=1), today - timedelta(days=1)),
+        "week": (week_start, today),
+        "month": (month_start, today),
+        "previous_month": (previous_month_start, month_start - timedelta(days=1)),
+    }
+    # Collapse the rollup to one row per day first, so the per-period sums run over at most ~62 rows
+    daily = (
+        db.query(
+            DailySalesSummary.sale_date.label("day"),
+            func.sum(DailySalesSummary.revenue).label("revenue"),
+            func.sum(DailySalesSummary.quantity).label("units"),
+        )
+        .filter(DailySalesSummary.sale_date >= min(week_start, previous_month_start), DailySalesSummary.sale_date <= today)
+        .group_by(DailySalesSummary.sale_date)
+        .subquery()
+    )
+    columns = []
+    for name, (first, last) in periods.items():
+        in_period = daily.c.day.between(first, last)
+        columns.append(func.coalesce(func.sum(case((in_period, daily.c.revenue), else_=0)), 0).label(f"{name}_revenue"))
+        columns.append(func.coalesce(func.sum(case((in_period, daily.c.units), else_=0)), 0).label(f"{name}_units"))
+    sales = db.query(*columns).one()
+
+    stock = db.query(
+        func.count(Item.id).label("item_count"),
+        func.coalesce(func.sum(Item.quantity), 0).label("stock_units"),
+        func.coalesce(func.sum(case((Item.quantity <= low_stock, 1), else_=0)), 0).label("low_stock_count"),
+        func.coalesce(func.sum(Item.quantity * Item.purchase_price), 0).label("value_cost"),
+        func.coalesce(func.sum(Item.quantity * Item.price), 0).label("value_retail"),
+    ).one()
+
+    low = (
+        db.query(Item.id, Item.name, Item.product_code, Item.category, Item.quantity)
+        .filter(Item.quantity <= low_stock)
+        .order_by(Item.quantity, Item.id)
+        .limit(low_stock_items)
         .all()
     )
-    return results 
\ No newline at end of file
+    latest = (
+        db.query(Invoice.id, Invoice.created_at, Invoice.client_name,
+                 func.coalesce(Invoice.total_amount, 0).label("total_amount"), Invoice.payment_status)
+        .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+        .limit(recent)
+        .all()
+    )
+    return {
+        **{
+            name: {"revenue": float(getattr(sales, f"{name}_revenue")), "units": int(getattr(sales, f"{name}_units"))}
+            for name in periods
+        },
+        "item_count": stock.item_count,
+        "stock_units": int(stock.stock_units),
+        "low_stock_threshold": low_stock,
+        "low_stock_count": int(stock.low_stock_count),
+        "low_stock_items": [row._asdict() for row in low],
+        "inventory_value_cost": float(stock.value_cost),
+        "inventory_value_retail": float(stock.value_retail),
+        "recent_invoices": [row._asdict() for row in latest],
+    }
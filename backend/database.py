@@ -1,30 +1,150 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from models import Base
 from datetime import datetime
+from typing import Union
 import os
 from dotenv import load_dotenv
+import search_index, slow_query_log
 
 # Load environment variables from .env file
 load_dotenv()
 
-# SQLALCHEMY_DATABASE_URL = "sqlite:///./workshop.db"
+# Engine configuration, all optional:
+#   DB_BACKEND              "postgresql" (default) or "sqlite"
+#   DATABASE_URL            full SQLAlchemy URL, overrides DB_BACKEND and the DB_* parts
+#   SQLITE_PATH             database file for the sqlite backend (default ./workshop.db)
+#   DB_SSLMODE              Postgres sslmode (default require)
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+#   DB_STATEMENT_CACHE_SIZE compiled-statement cache (and asyncpg prepared statement cache)
+#   DB_CONNECT_TIMEOUT      seconds to wait for a new connection (SQLite: busy timeout)
+#   DB_STATEMENT_TIMEOUT_MS Postgres statement_timeout, 0 disables
+#   SLOW_QUERY_MS           log statements at least this slow with their plan (default 0, off)
+#   SLOW_QUERY_LOG          slow-query log file (default ./slow_queries.log, rotated at 10 MB)
+#   SLOW_QUERY_ANALYZE      explain slow SELECTs with ANALYZE, running them again
 
-# engine = create_engine(
-#     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-# )
-# SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
 
-DATABASE_URL = (
-    f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-)
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
 
-engine = create_engine(DATABASE_URL, connect_args={"sslmode": "require"})
+def database_url() -> str:
+    if os.getenv("DATABASE_URL"):
+        return os.getenv("DATABASE_URL")
+    if os.getenv("DB_BACKEND", "postgresql").lower() == "sqlite":
+        return f"sqlite:///{os.getenv('SQLITE_PATH', './workshop.db')}"
+    return (
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    )
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Per-connection settings; WAL lets readers run alongside the single writer
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA busy_timeout={_env_int('DB_CONNECT_TIMEOUT', 10) * 1000}")
+    cursor.close()
+
+def engine_options(url, use_async: bool = False) -> dict:
+    """Keyword arguments for create_engine/create_async_engine from the environment"""
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "query_cache_size": _env_int("DB_STATEMENT_CACHE_SIZE", 500),
+    }
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False, "timeout": _env_int("DB_CONNECT_TIMEOUT", 10)}
+        if url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool  # One shared connection keeps the in-memory database alive
+            return options
+    else:
+        connect_timeout = _env_int("DB_CONNECT_TIMEOUT", 10)
+        statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+        sslmode = os.getenv("DB_SSLMODE", "require")
+        if use_async:
+            connect_args = {
+                "ssl": sslmode,
+                "timeout": connect_timeout,
+                "prepared_statement_cache_size": _env_int("DB_STATEMENT_CACHE_SIZE", 500),
+            }
+            if statement_timeout:
+                connect_args["server_settings"] = {"statement_timeout": str(statement_timeout)}
+        else:
+            connect_args = {"sslmode": sslmode, "connect_timeout": connect_timeout}
+            if statement_timeout:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+        options["connect_args"] = connect_args
+    options.update(
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+    )
+    return options
+
+def _log_slow_queries(sync_engine):
+    threshold = _env_int("SLOW_QUERY_MS", 0)
+    if threshold > 0:
+        slow_query_log.configure(os.getenv("SLOW_QUERY_LOG", slow_query_log.DEFAULT_PATH))
+        slow_query_log.install(sync_engine, threshold, analyze=_env_bool("SLOW_QUERY_ANALYZE", False))
+
+def create_engine_from_env(url=None):
+    url = url or database_url()
+    new_engine = create_engine(url, **engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    _log_slow_queries(new_engine)
+    return new_engine
+
+DATABASE_URL = database_url()
+
+engine = create_engine_from_env(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async request path: set DB_ASYNC=1 to serve requests through an AsyncSession
+# (asyncpg for Postgres, aiosqlite for SQLite). Startup and the maintenance
+# scripts keep using the sync engine above.
+USE_ASYNC = _env_bool("DB_ASYNC", False)
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+async_engine = None
+AsyncSessionLocal = None
+
+def create_async_engine_for(url):
+    """Build an async engine for the same database as a sync URL"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    new_engine = create_async_engine(url.set(drivername=ASYNC_DRIVERS[backend]), **engine_options(url, use_async=True))
+    if backend == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    _log_slow_queries(new_engine.sync_engine)
+    return new_engine
+
+if USE_ASYNC:
+    async_engine = create_async_engine_for(DATABASE_URL)
+    # Keep loaded attributes after commit; lazy reloads are not possible outside run_sync
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Type of the session handed to request handlers by main.get_db
+DbSession = Union[Session, AsyncSession]
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    search_index.create(engine)
 
 def add_sample_items():
     from models import Item
@@ -0,0 +1,40 @@
+"""
+CSV and NDJSON encoding shared by the streaming export endpoints.
+
+Rows are encoded a page at a time, so a response can be written as the
+database hands rows over instead of being built in memory first.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Iterable, List, Mapping
+
+FORMATS = ("csv", "ndjson")
+FORMAT_PATTERN = "^(csv|ndjson)$"
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def header(fields: List[str], fmt: str) -> str:
+    """Text that starts the export; empty for NDJSON"""
+    if fmt == "ndjson":
+        return ""
+    out = io.StringIO()
+    csv.writer(out).writerow(fields)
+    return out.getvalue()
+
+def encode(rows: Iterable[Mapping], fields: List[str], fmt: str) -> str:
+    """Serialize a page of mappings, keeping only `fields`"""
+    values = itemgetter(*fields) if len(fields) > 1 else lambda row: (row[fields[0]],)
+    records = [values(row) for row in rows]
+    if fmt == "ndjson":
+        return "".join(json.dumps(dict(zip(fields, record)), default=_json_default) + "\n" for record in records)
+    out = io.StringIO()
+    csv.writer(out).writerows(records)
+    return out.getvalue()
@@ -0,0 +1,51 @@
+"""
+orjson fast path for large list responses.
+
+Routes that opt in return rows_response(rows, schema) instead of letting
+FastAPI build and validate one response model per row. Each row, a
+SQLAlchemy Row or an ORM object, is turned into a plain dict holding the
+schema's fields with a getter built once per response, and the list is
+encoded with orjson in one call. The route keeps its response_model, so
+the OpenAPI schema is unchanged.
+
+Values are written as the database returns them: there is no per-row
+validation or type coercion, so only use this where the query already
+yields the schema's types.
+"""
+
+from operator import attrgetter, itemgetter
+from typing import Optional, Sequence, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+_fields = {}
+
+def fields(schema: Type[BaseModel]) -> tuple:
+    """The schema's field names, in declaration order"""
+    if schema not in _fields:
+        _fields[schema] = tuple(schema.model_fields)
+    return _fields[schema]
+
+def _getter(names: tuple, first):
+    """Function returning a row's values for `names`, as a tuple"""
+    if hasattr(first, "_fields"):
+        # Row: read by position; fields the query did not select point at a trailing None
+        columns = first._fields
+        get = itemgetter(*[columns.index(name) if name in columns else len(columns) for name in names])
+        values = lambda row: get((*row, None))
+    else:
+        # ORM object: every field must be an attribute or property
+        values = attrgetter(*names)
+    return values if len(names) > 1 else lambda row: (values(row),)
+
+def encode_rows(rows: Sequence, schema: Type[BaseModel]) -> list:
+    """Plain dicts with the schema's fields, in the schema's order"""
+    if not rows:
+        return []
+    names = fields(schema)
+    values = _getter(names, rows[0])
+    return [dict(zip(names, values(row))) for row in rows]
+
+def rows_response(rows: Sequence, schema: Type[BaseModel], headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse(encode_rows(rows, schema), headers=headers)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Bulk-load synthetic items, customers, invoices and payments for benchmarking.
+
+Rows are generated from a seeded RNG, so the same arguments always produce
+the same data, and written with batched executemany INSERTs against the
+configured database (SQLite or Postgres). Customer balances and the daily
+sales rollup are rebuilt at the end so every derived table is consistent.
+
+    python generate_data.py --items 100000 --customers 50000 --invoices 500000 --lines 2000000
+    python generate_data.py --reset          # empty the tables first
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+import crud, database, models
+
+CATEGORIES = ["Lubricants", "Spare Parts", "Car Accessories", "Filters", "Tyres", "Batteries", "Lighting", "Body Parts"]
+PART_NAMES = ["Oil Filter", "Air Filter", "Brake Pads", "Brake Disc", "Spark Plug", "Wiper Blade", "Headlight Bulb",
+              "Engine Oil", "Coolant", "Timing Belt", "Clutch Plate", "Shock Absorber", "Floor Mats", "Seat Cover",
+              "Battery", "Tyre", "Side Mirror", "Fuel Pump", "Radiator Cap", "Fan Belt"]
+WALK_IN_SHARE = 0.2
+# Share of invoices that are paid in full, partly paid; the rest are unpaid
+PAID_SHARE, PARTIAL_SHARE = 0.5, 0.3
+
+class BatchWriter:
+    """Buffers rows per table and writes them with one executemany per batch"""
+
+    def __init__(self, engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.pending = {}
+        self.written = {}
+        self.started = time.monotonic()
+
+    def add(self, table, row: dict):
+        rows = self.pending.setdefault(table, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        # Parents first, so foreign keys are satisfied on databases that enforce them
+        order = [models.Item.__table__, models.Customer.__table__, models.Invoice.__table__,
+                 models.InvoiceItem.__table__, models.Payment.__table__]
+        tables = order if table is None else order[:order.index(table) + 1]
+        with self.engine.begin() as conn:
+            for current in tables:
+                rows = self.pending.pop(current, [])
+                if rows:
+                    conn.execute(insert(current), rows)
+                    self.written[current.name] = self.written.get(current.name, 0) + len(rows)
+        counts = ", ".join(f"{name} {count}" for name, count in self.written.items())
+        print(f"  {counts} ({time.monotonic() - self.started:.1f}s)")
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def reset(engine):
+    print("Deleting existing rows...")
+    with engine.begin() as conn:
+        for model in (models.Payment, models.InvoiceItem, models.DailySalesSummary, models.Invoice,
+                      models.Customer, models.Item, models.TableVersion):
+            conn.execute(model.__table__.delete())
+
+def generate(items: int, customers: int, invoices: int, lines: int, days: int, seed: int, batch_size: int):
+    engine = database.engine
+    rng = random.Random(seed)
+    writer = BatchWriter(engine, batch_size)
+    with engine.connect() as conn:
+        item_id = _next_id(conn, models.Item)
+        customer_id = _next_id(conn, models.Customer)
+        invoice_id = _next_id(conn, models.Invoice)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    print(f"Generating {items} items...")
+    prices = {}
+    costs = {}
+    categories = {}
+    for offset in range(items):
+        id_ = item_id + offset
+        price = round(rng.uniform(200, 25000), -1)
+        prices[id_] = price
+        costs[id_] = round(price * rng.uniform(0.55, 0.85), -1)
+        categories[id_] = rng.choice(CATEGORIES)
+        writer.add(models.Item.__table__, {
+            "id": id_, "name": f"{rng.choice(PART_NAMES)} {id_}", "price": price,
+            "purchase_price": costs[id_], "product_code": f"GEN-{id_:07d}",
+            "category": categories[id_], "image_filename": None, "quantity": rng.randint(0, 500),
+            "created_at": now, "updated_at": now,
+        })
+    item_ids = list(prices)
+
+    print(f"Generating {customers} customers...")
+    customer_names = {}
+    for offset in range(customers):
+        id_ = customer_id + offset
+        customer_names[id_] = f"Customer {id_}"
+        writer.add(models.Customer.__table__, {
+            "id": id_, "name": customer_names[id_], "phone": f"03{rng.randint(0, 999999999):09d}", "email": None,
+            "address": None, "customer_type": "regular", "outstanding_balance": 0.0,
+            "created_at": now, "updated_at": now,
+        })
+    customer_ids = list(customer_names)
+
+    print(f"Generating {invoices} invoices with {lines} lines...")
+    lines_left = max(lines, invoices)
+    for offset in range(invoices):
+        id_ = invoice_id + offset
+        invoices_left = invoices - offset
+        # Vary invoice sizes while hitting the requested line total exactly
+        average = lines_left / invoices_left
+        count = lines_left if invoices_left == 1 else rng.randint(1, max(1, min(int(2 * average) - 1, lines_left - invoices_left + 1)))
+        lines_left -= count
+
+        created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+        line_rows = [
+            {"invoice_id": id_, "item_id": item, "quantity": rng.randint(1, 5), "price": prices[item],
+             "purchase_price": costs[item], "category": categories[item]}
+            for item in rng.sample(item_ids, min(count, len(item_ids)))
+        ]
+        total = sum(row["quantity"] * row["price"] for row in line_rows)
+        roll = rng.random()
+        if roll < PAID_SHARE:
+            paid = total
+        elif roll < PAID_SHARE + PARTIAL_SHARE:
+            paid = round(total * rng.uniform(0.1, 0.9), -1)
+        else:
+            paid = 0.0
+        status = "paid" if paid >= total else "partial" if paid > 0 else "unpaid"
+        customer = rng.choice(customer_ids) if customer_ids and rng.random() >= WALK_IN_SHARE else None
+
+        writer.add(models.Invoice.__table__, {
+            "id": id_, "created_at": created_at, "customer_id": customer,
+            "client_name": customer_names[customer] if customer else "Walk-in Customer", "client_phone": None,
+            "total_amount": total, "amount_paid": paid, "outstanding_balance": total - paid,
+            "payment_status": status, "idempotency_key": None,
+        })
+        for row in line_rows:
+            writer.add(models.InvoiceItem.__table__, row)
+        if paid > 0:
+            writer.add(models.Payment.__table__, {"customer_id": customer, "invoice_id": id_, "amount": paid, "created_at": created_at})
+    writer.flush()
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for table in ("items", "customers", "invoices"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+
+    print("Rebuilding customer balances and the daily sales rollup...")
+    db = database.SessionLocal()
+    try:
+        crud.reconcile_customer_balances(db)
+        crud.rebuild_daily_sales_summary(db)
+        crud.bump_table_version(db, "items", "customers", "invoices")
+        db.commit()
+    finally:
+        db.close()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"Done in {time.monotonic() - writer.started:.1f}s.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic data into the configured database")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--invoices", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=20000, help="total invoice lines, spread over the invoices")
+    parser.add_argument("--days", type=int, default=365, help="spread invoices over this many past days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per INSERT batch")
+    parser.add_argument("--reset", action="store_true", help="delete existing rows first")
+    args = parser.parse_args()
+    if args.items < 1 and args.invoices:
+        parser.error("invoices need at least one item")
+
+    database.init_db()
+    if args.reset:
+        reset(database.engine)
+    generate(args.items, args.customers, args.invoices, args.lines, args.days, args.seed, args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Stored image naming rules.
+
+Kept free of I/O and web imports so models.py can derive thumbnail names
+without pulling in image_store and its worker pool.
+"""
+
+import os
+import re
+from typing import Optional
+
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}(\.thumb)?(\.[a-z0-9]{1,5})?$")
+
+def is_content_addressed(filename: Optional[str]) -> bool:
+    return bool(filename) and bool(CONTENT_ADDRESSED.match(filename))
+
+def webp_name(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".webp"
+
+def thumbnail_name(filename: Optional[str]) -> Optional[str]:
+    """Thumbnail for a stored image, or None for legacy uploads that have none"""
+    if not is_content_addressed(filename):
+        return None
+    return os.path.splitext(filename)[0] + ".thumb.webp"
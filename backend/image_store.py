@@ -0,0 +1,96 @@
+"""
+Item image storage.
+
+Uploads are streamed to disk in chunks and stored under the SHA-256 of
+their content, so identical uploads share one file and a stored name never
+changes meaning. That makes every stored file safe to cache forever. A
+WebP copy and a small WebP thumbnail are generated next to each image in
+a worker pool.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import anyio
+from fastapi import UploadFile
+from fastapi.staticfiles import StaticFiles
+
+from image_names import is_content_addressed, thumbnail_name, webp_name
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "images"
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+WEBP_QUALITY = 80
+# Content-addressed files never change; legacy client-named files can be overwritten
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LEGACY_CACHE_CONTROL = "public, max-age=3600"
+
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_WORKERS", "2")), thread_name_prefix="image-variants")
+
+def _extension(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,5}", ext) else ""
+
+def _write_variants(path: str):
+    from PIL import Image, ImageOps
+
+    filename = os.path.basename(path)
+    directory = os.path.dirname(path)
+    webp_path = os.path.join(directory, webp_name(filename))
+    thumb_path = os.path.join(directory, thumbnail_name(filename))
+    if os.path.exists(webp_path) and os.path.exists(thumb_path):
+        return
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        if not os.path.exists(webp_path):
+            image.save(webp_path, "WEBP", quality=WEBP_QUALITY)
+        image.thumbnail(THUMBNAIL_SIZE)
+        image.save(thumb_path, "WEBP", quality=WEBP_QUALITY)
+
+async def make_variants(path: str):
+    """Generate WebP variants off the event loop; a non-image upload just gets none"""
+    try:
+        await asyncio.get_running_loop().run_in_executor(_pool, _write_variants, path)
+    except Exception as e:
+        logger.warning("Could not create image variants for %s: %s", path, e)
+
+async def save_upload(upload: UploadFile, upload_dir: str = UPLOAD_DIR) -> str:
+    """Stream an upload to its content-addressed file and return the stored filename"""
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(upload_dir, f".upload-{uuid.uuid4().hex}")
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                digest.update(chunk)
+                await out.write(chunk)
+        filename = digest.hexdigest() + _extension(upload.filename)
+        final_path = os.path.join(upload_dir, filename)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # Same content already stored
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    await make_variants(final_path)
+    return filename
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that marks content-addressed images as immutable"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        name = os.path.basename(full_path)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if is_content_addressed(name) else LEGACY_CACHE_CONTROL
+        return response
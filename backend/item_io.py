@@ -0,0 +1,93 @@
+"""
+CSV and NDJSON encoding of items for bulk import and export.
+
+Imports are parsed incrementally from the request body stream, so a large
+catalog is never held in memory at once. Each record comes back with its
+row number and either the raw field dict or a parse error, and the caller
+validates and batches them. Exports write the same columns, so an exported
+file can be edited and imported again.
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from pydantic import ValidationError
+
+import export_format, schemas
+
+FIELDS = ["product_code", "name", "category", "price", "purchase_price", "quantity"]
+
+def format_from_content_type(content_type: Optional[str]) -> str:
+    """Pick the import format from the request Content-Type, defaulting to CSV"""
+    if content_type and ("ndjson" in content_type or "jsonlines" in content_type or "json" in content_type):
+        return "ndjson"
+    return "csv"
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Group lines into whole CSV records; a quoted field may span lines"""
+    record = ""
+    async for line in _lines(chunks):
+        record += line
+        if record.count('"') % 2 == 0:
+            yield record
+            record = ""
+    if record:
+        yield record
+
+async def read_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row number, fields, error) for each data record in the stream"""
+    row = 0
+    if fmt == "ndjson":
+        async for line in _lines(chunks):
+            row += 1
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError as e:
+                yield row, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(fields, dict):
+                yield row, fields, None
+            else:
+                yield row, None, "Expected a JSON object"
+        return
+
+    header = None
+    async for record in _csv_records(chunks):
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row, dict(zip(header, values)), None
+
+def to_item(fields: dict) -> schemas.ItemCreate:
+    """Validate one record; raises ValueError with a readable message"""
+    try:
+        return schemas.ItemCreate(**{name: fields.get(name) for name in FIELDS})
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+
+def encode(items: Iterable, fmt: str) -> str:
+    """Serialize a page of items in the export format"""
+    return export_format.encode(({name: getattr(item, name) for name in FIELDS} for item in items), FIELDS, fmt)
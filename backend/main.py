@@ -1,14 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Body, Query
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Body, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import os
-import models, schemas, crud, database
-from typing import List, Optional
-from shutil import copyfileobj
+from contextlib import asynccontextmanager
+import models, schemas, crud, database, image_store, catalog_cache, item_io, export_format, metrics, reorder, fast_json, compression
+from typing import List, Optional, Union
 
-app = FastAPI()
+# orjson for every JSON response; large lists also skip per-row models via fast_json
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Allow frontend to access backend
 app.add_middleware(
@@ -17,14 +18,67 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
+app.add_middleware(compression.CompressionMiddleware)
+# Outermost, so timings cover the whole stack
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(database.engine, "sync")
+if database.async_engine is not None:
+    metrics.instrument_engine(database.async_engine.sync_engine, "async")
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Largest page a listing endpoint will return when `limit` is given
+MAX_PAGE_SIZE = 500
+# Default and largest result count for the search endpoints
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Rows per upsert statement and commit in bulk item imports
+IMPORT_BATCH_SIZE = 1000
+# Per-row errors listed in an import result; the failed count is always complete
+MAX_IMPORT_ERRORS = 1000
+# Rows fetched per query while streaming an export
+EXPORT_PAGE_SIZE = 1000
+# Invoices committed per transaction in a batch submission
+INVOICE_BATCH_CHUNK_SIZE = 200
+# Seconds a computed dashboard summary is served before being recomputed
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "15"))
+dashboard_cache = catalog_cache.TTLCache(maxsize=32, ttl=DASHBOARD_CACHE_TTL)
+
+async def get_db():
+    if database.USE_ASYNC:
+        async with database.AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = database.SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+# For streaming responses, which outlive the request's get_db session
+open_db = asynccontextmanager(get_db)
+
+async def run_db(db: database.DbSession, fn, *args, **kwargs):
+    """Run a sync crud function on either session flavour.
+
+    AsyncSession.run_sync drives the crud code over the async driver without
+    a worker thread; plain Sessions run in the threadpool as before.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+async def stream_rows(db: database.DbSession, stmt, chunk_size: int):
+    """Yield lists of row mappings from a server-side cursor, `chunk_size` rows at a time"""
+    stmt = stmt.execution_options(yield_per=chunk_size)
+    if isinstance(db, AsyncSession):
+        result = await db.stream(stmt)
+        async for chunk in result.mappings().partitions():
+            yield chunk
+    else:
+        result = await run_in_threadpool(db.execute, stmt)
+        async for chunk in iterate_in_threadpool(result.mappings().partitions()):
+            yield chunk
 
 @app.on_event("startup")
 def on_startup():
@@ -42,17 +96,179 @@ def on_startup():
         print(f"Error during startup: {e}")
         raise e
 
-UPLOAD_DIR = "images"
+@app.on_event("shutdown")
+async def on_shutdown():
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+def parse_day(value: Optional[str], field: str):
+    """Parse a YYYY-MM-DD query parameter, raising 400 on bad input"""
+    from datetime import datetime
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field} date format. Use YYYY-MM-DD.")
+
+async def not_modified(request: Request, response: Response, db: database.DbSession, *tables: str) -> Optional[Response]:
+    """Answer 304 if the client's ETag matches the tables' versions, else tag the response.
+
+    The ETag combines the write counter of every table the response reads
+    with the query string, so it is read before the listing query runs and
+    changes whenever a tracked write to any of them commits.
+    """
+    import hashlib
+    versions = await run_db(db, crud.get_table_versions, tables)
+    params = hashlib.sha1(str(request.query_params).encode()).hexdigest()[:12]
+    stamp = "-".join(f"{table}-{versions[table]}" for table in tables)
+    etag = f'W/"{stamp}-{params}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+UPLOAD_DIR = image_store.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-app.mount("/images", StaticFiles(directory="images"), name="images")
+app.mount("/images", image_store.CachedStaticFiles(directory=UPLOAD_DIR), name="images")
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus text exposition of request, SQL and pool metrics"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/items", response_model=List[schemas.ItemResponse])
-def list_items(db: Session = Depends(get_db)):
-    return crud.get_items(db)
+async def list_items(
+    request: Request,
+    response: Response,
+    after: Optional[int] = Query(None, description="Cursor: return items with id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    category: Optional[str] = None,
+    low_stock: Optional[int] = Query(None, description="Only items with quantity at or below this"),
+    name_prefix: Optional[str] = None,
+    db: database.DbSession = Depends(get_db),
+):
+    if cached := await not_modified(request, response, db, "items"):
+        return cached
+    items = await run_db(db, crud.get_items, after=after, limit=limit, category=category, low_stock=low_stock, name_prefix=name_prefix)
+    if limit is not None and len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(items[-1].id)
+    return fast_json.rows_response(items, schemas.ItemResponse, headers=response.headers)
+
+@app.get("/items/search", response_model=List[schemas.ItemResponse])
+async def search_items(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Product code, name or category; prefix, substring or fuzzy"),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    category: Optional[str] = None,
+    db: database.DbSession = Depends(get_db),
+):
+    if cached := await not_modified(request, response, db, "items"):
+        return cached
+    return await run_db(db, crud.search_items, q, limit=limit, category=category)
+
+@app.get("/items/by-code/{product_code}", response_model=schemas.ItemResponse)
+async def get_item_by_code(product_code: str, db: database.DbSession = Depends(get_db)):
+    item = await run_db(db, crud.get_item_by_code, product_code)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+@app.get("/items/cache-stats")
+def item_cache_stats():
+    return catalog_cache.items.stats()
+
+@app.post("/items/import", response_model=schemas.ItemImportResult)
+async def import_items(
+    request: Request,
+    format: Optional[str] = Query(None, pattern=export_format.FORMAT_PATTERN, description="Defaults from Content-Type"),
+    db: database.DbSession = Depends(get_db),
+):
+    """Upsert items by product_code from a CSV or NDJSON request body.
+
+    The body is parsed as it streams in and written IMPORT_BATCH_SIZE rows
+    per statement. Invalid rows are reported and skipped; the rest still import.
+    """
+    from sqlalchemy.exc import SQLAlchemyError
+    fmt = format or item_io.format_from_content_type(request.headers.get("content-type"))
+    result = {"created": 0, "updated": 0, "failed": 0, "errors": []}
+    batch = []
+
+    def fail(row, product_code, error):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_IMPORT_ERRORS:
+            result["errors"].append({"row": row, "product_code": product_code, "error": error})
+
+    async def write(rows):
+        counts = await run_db(db, crud.upsert_items, [item for _, item in rows])
+        result["created"] += counts["created"]
+        result["updated"] += counts["updated"]
+
+    async def flush():
+        try:
+            await write(batch)
+        except SQLAlchemyError:
+            # Retry row by row to pin the database error on the rows that caused it
+            for row, item in batch:
+                try:
+                    await write([(row, item)])
+                except SQLAlchemyError as e:
+                    fail(row, item.product_code, str(getattr(e, "orig", None) or e).splitlines()[0])
+        batch.clear()
+
+    try:
+        async for row, fields, error in item_io.read_records(request.stream(), fmt):
+            if error is None:
+                try:
+                    batch.append((row, item_io.to_item(fields)))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                code = (fields or {}).get("product_code")
+                fail(row, str(code) if code is not None else None, error)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=f"Import body must be UTF-8; {result['created'] + result['updated']} rows were imported before the error")
+    if batch:
+        await flush()
+    return result
+
+@app.get("/items/export")
+async def export_items(format: str = Query("csv", pattern=export_format.FORMAT_PATTERN)):
+    """Stream every item as CSV or NDJSON, in the columns /items/import accepts"""
+    async def rows():
+        async with open_db() as db:
+            if header := export_format.header(item_io.FIELDS, format):
+                yield header
+            after = None
+            while True:
+                page = await run_db(db, crud.get_items, after=after, limit=EXPORT_PAGE_SIZE)
+                if page:
+                    yield item_io.encode(page, format)
+                if len(page) < EXPORT_PAGE_SIZE:
+                    break
+                after = page[-1].id
+
+    return StreamingResponse(
+        rows(),
+        media_type=export_format.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
+
+@app.get("/items/{item_id}", response_model=schemas.ItemResponse)
+async def get_item(item_id: int, db: database.DbSession = Depends(get_db)):
+    item = await run_db(db, crud.get_item_snapshot, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 @app.post("/items", response_model=schemas.ItemResponse)
-def create_item(
+async def create_item(
     name: str = Form(...),
     price: float = Form(...),
     purchase_price: float = Form(...),
@@ -60,13 +276,11 @@ def create_item(
     category: str = Form(...),
     quantity: int = Form(...),  # Add the missing quantity field
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: database.DbSession = Depends(get_db),
 ):
     image_filename = None
     if image:
-        image_filename = image.filename
-        with open(os.path.join(UPLOAD_DIR, image_filename), "wb") as buffer:
-            copyfileobj(image.file, buffer)
+        image_filename = await image_store.save_upload(image)
     
     item_in = schemas.ItemCreate(
         name=name, 
@@ -76,10 +290,10 @@ def create_item(
         category=category,
         quantity=quantity  # Include quantity in the schema
     )
-    return crud.create_item(db, item_in, image_filename=image_filename)
+    return await run_db(db, crud.create_item, item_in, image_filename=image_filename)
 
 @app.put("/items/{item_id}", response_model=schemas.ItemResponse)
-def update_item(
+async def update_item(
     item_id: int,
     name: Optional[str] = File(None),
     price: Optional[float] = File(None),
@@ -88,13 +302,11 @@ def update_item(
     category: Optional[str] = File(None),
     quantity: Optional[int] = File(None),
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: database.DbSession = Depends(get_db),
 ):
     image_filename = None
     if image:
-        image_filename = image.filename
-        with open(os.path.join(UPLOAD_DIR, image_filename), "wb") as buffer:
-            copyfileobj(image.file, buffer)
+        image_filename = await image_store.save_upload(image)
     item_update = schemas.ItemUpdate()
     if name is not None:
         item_update.name = name
@@ -108,108 +320,323 @@ def update_item(
         item_update.category = category
     if quantity is not None:
         item_update.quantity = quantity
-    updated = crud.update_item(db, item_id, item_update, image_filename=image_filename)
+    updated = await run_db(db, crud.update_item, item_id, item_update, image_filename=image_filename)
     if not updated:
         raise HTTPException(status_code=404, detail="Item not found")
     return updated 
 
 @app.post("/invoices")
-def create_invoice(invoice: schemas.InvoiceCreate = Body(...), db: Session = Depends(get_db)):
+async def create_invoice(
+    invoice: schemas.InvoiceCreate = Body(...),
+    idempotency_key: Optional[str] = Header(None),
+    db: database.DbSession = Depends(get_db),
+):
+    if idempotency_key and not invoice.idempotency_key:
+        invoice.idempotency_key = idempotency_key
     try:
-        result = crud.create_invoice(db, invoice)
+        result = await run_db(db, crud.create_invoice, invoice)
         return {"success": True, "invoice_id": result.id}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) 
 
-@app.get("/invoices/by-date", response_model=List[schemas.InvoiceResponse])
-def get_invoices_by_date(date: str = Query(..., description="YYYY-MM-DD"), db: Session = Depends(get_db)):
+@app.post("/invoices/batch", response_model=List[schemas.InvoiceBatchResult])
+async def create_invoice_batch(batch: schemas.InvoiceBatchCreate, db: database.DbSession = Depends(get_db)):
+    """Submit many invoices, e.g. ones queued while offline.
+
+    Stock is checked for each chunk of INVOICE_BATCH_CHUNK_SIZE invoices in
+    one pass, and each chunk commits as one transaction. Each invoice gets
+    its own result. Invoices carrying an idempotency_key that was already
+    used come back as "duplicate" with the original invoice_id, so the whole
+    batch can be retried safely.
+    """
+    results = []
+    for offset in range(0, len(batch.invoices), INVOICE_BATCH_CHUNK_SIZE):
+        chunk = batch.invoices[offset:offset + INVOICE_BATCH_CHUNK_SIZE]
+        try:
+            outcomes = await run_db(db, crud.create_invoices, chunk)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=f"{e}; invoices before index {offset} were saved")
+        results += [
+            {"index": offset + i, "idempotency_key": invoice.idempotency_key, **outcome}
+            for i, (invoice, outcome) in enumerate(zip(chunk, outcomes))
+        ]
+    return results
+
+def invoice_views(invoices, compact: bool):
+    schema = schemas.InvoiceCompactResponse if compact else schemas.InvoiceResponse
+    return [schema.model_validate(invoice) for invoice in invoices]
+
+@app.get("/invoices", response_model=Union[List[schemas.InvoiceResponse], List[schemas.InvoiceCompactResponse]])
+async def list_invoices(
+    request: Request,
+    response: Response,
+    start: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    customer_id: Optional[int] = None,
+    payment_status: Optional[str] = Query(None, description="paid, partial or unpaid"),
+    before: Optional[str] = Query(None, description="Cursor from X-Next-Cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    compact: bool = Query(False, description="Lines carry only product name and code"),
+    db: database.DbSession = Depends(get_db),
+):
+    from datetime import datetime, timedelta
+    range_start = parse_day(start, "start")
+    range_end = parse_day(end, "end")
+    if range_end is not None:
+        range_end += timedelta(days=1)
+    cursor = None
+    if before is not None:
+        try:
+            created_at, invoice_id = before.rsplit("_", 1)
+            cursor = (datetime.fromisoformat(created_at), int(invoice_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    if cached := await not_modified(request, response, db, "invoices", "items"):
+        return cached
+    invoices = await run_db(
+        db, crud.get_invoices, start=range_start, end=range_end, customer_id=customer_id,
+        payment_status=payment_status, before=cursor, limit=limit, compact=compact
+    )
+    if len(invoices) == limit:
+        last = invoices[-1]
+        response.headers["X-Next-Cursor"] = f"{last.created_at.isoformat()}_{last.id}"
+    return invoice_views(invoices, compact)
+
+@app.get("/invoices/export")
+async def export_invoices(
+    start: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    format: str = Query("csv", pattern=export_format.FORMAT_PATTERN),
+    lines: bool = Query(True, description="One row per invoice line; false for one row per invoice"),
+):
+    """Stream invoices over a date range as CSV or NDJSON, oldest first.
+
+    Rows come from a server-side cursor EXPORT_PAGE_SIZE at a time and are
+    written as they arrive, so memory does not grow with the range.
+    """
+    from datetime import timedelta
+    range_start = parse_day(start, "start")
+    range_end = parse_day(end, "end")
+    if range_end is not None:
+        range_end += timedelta(days=1)
+    fields = crud.INVOICE_LINE_EXPORT_FIELDS if lines else crud.INVOICE_EXPORT_FIELDS
+    stmt = crud.invoice_export_query(range_start, range_end, lines=lines)
+
+    async def rows():
+        if header := export_format.header(fields, format):
+            yield header
+        async with open_db() as db:
+            async for chunk in stream_rows(db, stmt, EXPORT_PAGE_SIZE):
+                yield export_format.encode(chunk, fields, format)
+
+    filename = f"invoices_{start or 'start'}_{end or 'end'}.{format}"
+    return StreamingResponse(
+        rows(),
+        media_type=export_format.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/invoices/by-date", response_model=Union[List[schemas.InvoiceResponse], List[schemas.InvoiceCompactResponse]])
+async def get_invoices_by_date(
+    request: Request,
+    response: Response,
+    date: str = Query(..., description="YYYY-MM-DD"),
+    compact: bool = Query(False, description="Lines carry only product name and code"),
+    db: database.DbSession = Depends(get_db),
+):
     from datetime import datetime, timedelta
     try:
         day_start = datetime.strptime(date, "%Y-%m-%d")
         day_end = day_start + timedelta(days=1)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
-    invoices = db.query(models.Invoice).filter(models.Invoice.created_at >= day_start, models.Invoice.created_at < day_end).all()
-    return invoices
+    if cached := await not_modified(request, response, db, "invoices", "items"):
+        return cached
+    invoices = await run_db(db, crud.get_invoices, start=day_start, end=day_end, compact=compact)
+    return invoice_views(invoices, compact)
 
 @app.put("/invoices/{invoice_id}/payment", response_model=schemas.InvoiceResponse)
-def update_invoice_payment(invoice_id: int, payment_update: schemas.PaymentUpdate, db: Session = Depends(get_db)):
+async def update_invoice_payment(invoice_id: int, payment_update: schemas.PaymentUpdate, db: database.DbSession = Depends(get_db)):
     """Update payment status for an invoice"""
-    updated_invoice = crud.update_invoice_payment(db, invoice_id, payment_update)
+    updated_invoice = await run_db(db, crud.update_invoice_payment, invoice_id, payment_update)
     if not updated_invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return updated_invoice
 
 @app.post("/customers/{customer_id}/payment")
-def process_customer_payment(customer_id: int, payment: schemas.CustomerPayment, db: Session = Depends(get_db)):
+async def process_customer_payment(customer_id: int, payment: schemas.CustomerPayment, db: database.DbSession = Depends(get_db)):
     """Process payment for a customer across multiple invoices"""
     # Ensure customer_id matches the payment
     payment.customer_id = customer_id
     
-    result = crud.process_customer_payment(db, payment)
+    result = await run_db(db, crud.process_customer_payment, payment)
     return {
         "success": True,
         "message": f"Payment of Rs {payment.payment_amount} applied to {result['updated_invoices']} invoices",
         "details": result
     }
 
+@app.get("/customers/{customer_id}/payments", response_model=List[schemas.PaymentResponse])
+async def list_customer_payments(customer_id: int, db: database.DbSession = Depends(get_db)):
+    """Payment allocation history for a customer"""
+    return await run_db(db, crud.get_payments, customer_id=customer_id)
+
+@app.get("/invoices/{invoice_id}/payments", response_model=List[schemas.PaymentResponse])
+async def list_invoice_payments(invoice_id: int, db: database.DbSession = Depends(get_db)):
+    """Payments applied to an invoice"""
+    return await run_db(db, crud.get_payments, invoice_id=invoice_id)
+
 @app.put("/invoices/{invoice_id}/assign-customer", response_model=schemas.InvoiceResponse)
-def assign_invoice_to_customer(invoice_id: int, assignment: schemas.InvoiceCustomerAssignment, db: Session = Depends(get_db)):
+async def assign_invoice_to_customer(invoice_id: int, assignment: schemas.InvoiceCustomerAssignment, db: database.DbSession = Depends(get_db)):
     """Assign an existing invoice to a customer"""
-    updated_invoice = crud.assign_invoice_to_customer(db, invoice_id, assignment)
+    updated_invoice = await run_db(db, crud.assign_invoice_to_customer, invoice_id, assignment)
     if not updated_invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return updated_invoice
 
 # Customer endpoints
 @app.get("/customers", response_model=List[schemas.CustomerResponse])
-def list_customers(db: Session = Depends(get_db)):
-    return crud.get_customers(db)
+async def list_customers(
+    request: Request,
+    response: Response,
+    after: Optional[int] = Query(None, description="Cursor: return customers with id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    name_prefix: Optional[str] = None,
+    db: database.DbSession = Depends(get_db),
+):
+    if cached := await not_modified(request, response, db, "customers"):
+        return cached
+    customers = await run_db(db, crud.get_customers, after=after, limit=limit, name_prefix=name_prefix)
+    if limit is not None and len(customers) == limit:
+        response.headers["X-Next-Cursor"] = str(customers[-1].id)
+    return fast_json.rows_response(customers, schemas.CustomerResponse, headers=response.headers)
+
+@app.get("/customers/search", response_model=List[schemas.CustomerResponse])
+async def search_customers(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Name, phone or email; prefix, substring or fuzzy"),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: database.DbSession = Depends(get_db),
+):
+    if cached := await not_modified(request, response, db, "customers"):
+        return cached
+    return await run_db(db, crud.search_customers, q, limit=limit)
+
+@app.get("/customers/balances", response_model=List[schemas.CustomerBalance])
+async def list_customer_balances(db: database.DbSession = Depends(get_db)):
+    return [
+        schemas.CustomerBalance(customer_id=row.customer_id, outstanding_balance=max(0.0, row.outstanding_balance or 0.0))
+        for row in await run_db(db, crud.get_customer_balances)
+    ]
 
 @app.post("/customers", response_model=schemas.CustomerResponse)
-def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)):
-    return crud.create_customer(db, customer)
+async def create_customer(customer: schemas.CustomerCreate, db: database.DbSession = Depends(get_db)):
+    return await run_db(db, crud.create_customer, customer)
 
 @app.get("/customers/{customer_id}", response_model=schemas.CustomerResponse)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
-    customer = crud.get_customer(db, customer_id)
+async def get_customer(customer_id: int, db: database.DbSession = Depends(get_db)):
+    customer = await run_db(db, crud.get_customer, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
 @app.put("/customers/{customer_id}", response_model=schemas.CustomerResponse)
-def update_customer(customer_id: int, customer_update: schemas.CustomerUpdate, db: Session = Depends(get_db)):
-    updated_customer = crud.update_customer(db, customer_id, customer_update)
+async def update_customer(customer_id: int, customer_update: schemas.CustomerUpdate, db: database.DbSession = Depends(get_db)):
+    updated_customer = await run_db(db, crud.update_customer, customer_id, customer_update)
     if not updated_customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return updated_customer
 
 @app.delete("/customers/{customer_id}")
-def delete_customer(customer_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_customer(db, customer_id)
+async def delete_customer(customer_id: int, db: database.DbSession = Depends(get_db)):
+    success = await run_db(db, crud.delete_customer, customer_id)
     if not success:
         raise HTTPException(status_code=404, detail="Customer not found")
     return {"message": "Customer deleted successfully"}
 
 @app.get("/customers/{customer_id}/outstanding-balance")
-def get_customer_outstanding_balance(customer_id: int, db: Session = Depends(get_db)):
-    customer = crud.get_customer(db, customer_id)
+async def get_customer_outstanding_balance(customer_id: int, db: database.DbSession = Depends(get_db)):
+    customer = await run_db(db, crud.get_customer, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    outstanding_balance = crud.get_customer_outstanding_balance(db, customer_id)
+    outstanding_balance = await run_db(db, crud.get_customer_outstanding_balance, customer_id)
     return {"customer_id": customer_id, "outstanding_balance": outstanding_balance}
 
-@app.get("/sales-tracker", response_model=List[schemas.SalesTrackerEntry])
-def sales_tracker(db: Session = Depends(get_db)):
-    results = crud.get_sales_tracker(db)
-    # Convert SQLAlchemy Row objects to dicts for Pydantic
-    return [
-        schemas.SalesTrackerEntry(
-            date=row.date,
-            product_name=row.product_name,
-            category=row.category,
-            quantity=row.quantity,
-            revenue=row.revenue  # Use the pre-calculated revenue from CRUD
-        ) for row in results
-    ]
\ No newline at end of file
+@app.get("/sales-tracker", response_model=Union[List[schemas.SalesTrackerEntry], List[schemas.SalesTrackerBucket]])
+async def sales_tracker(
+    start: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    group_by: Optional[List[str]] = Query(None, description="day, month, category and/or product"),
+    db: database.DbSession = Depends(get_db),
+):
+    from datetime import timedelta
+    range_start = parse_day(start, "start")
+    range_end = parse_day(end, "end")
+    if range_end is not None:
+        range_end += timedelta(days=1)
+
+    if group_by:
+        try:
+            results = await run_db(db, crud.get_sales_tracker_summary, group_by, start=range_start, end=range_end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return fast_json.rows_response(results, schemas.SalesTrackerBucket)
+
+    results = await run_db(db, crud.get_sales_tracker, start=range_start, end=range_end)
+    return fast_json.rows_response(results, schemas.SalesTrackerEntry)
+
+@app.get("/sales-tracker/margins", response_model=List[schemas.MarginBucket])
+async def sales_margins(
+    start: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    group_by: Optional[List[str]] = Query(None, description="day, month, category and/or product; totals if omitted"),
+    db: database.DbSession = Depends(get_db),
+):
+    from datetime import timedelta
+    range_start = parse_day(start, "start")
+    range_end = parse_day(end, "end")
+    if range_end is not None:
+        range_end += timedelta(days=1)
+    try:
+        results = await run_db(db, crud.get_margin_report, group_by or [], start=range_start, end=range_end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json.rows_response(results, schemas.MarginBucket)
+
+@app.get("/dashboard/summary", response_model=schemas.DashboardSummary)
+async def dashboard_summary(
+    response: Response,
+    recent: int = Query(5, ge=1, le=50, description="Latest invoices to include"),
+    low_stock: int = Query(5, ge=0, description="Items at or below this quantity count as low stock"),
+    low_stock_items: int = Query(10, ge=0, le=100, description="Low-stock items to list, lowest quantity first"),
+    db: database.DbSession = Depends(get_db),
+):
+    from datetime import datetime
+    now = datetime.utcnow()
+    key = (now.date(), recent, low_stock, low_stock_items)
+    summary = dashboard_cache.get(key)
+    if summary is None:
+        data = await run_db(db, crud.get_dashboard_summary, now.date(), recent=recent, low_stock=low_stock, low_stock_items=low_stock_items)
+        summary = schemas.DashboardSummary(generated_at=now, **data)
+        dashboard_cache.set(key, summary)
+    response.headers["Cache-Control"] = f"private, max-age={int(DASHBOARD_CACHE_TTL)}"
+    return summary
+
+@app.get("/inventory/reorder-suggestions", response_model=schemas.ReorderReport)
+async def reorder_suggestions(
+    window_days: int = Query(28, ge=7, le=365, description="Days of sales history, ending yesterday"),
+    lead_time_days: int = Query(7, ge=0, le=180, description="Days between ordering and receiving stock"),
+    cover_days: int = Query(30, ge=1, le=365, description="Days of demand an order should cover after it arrives"),
+    service_z: float = Query(reorder.DEFAULT_SERVICE_Z, ge=0, le=4, description="Safety stock in standard deviations of daily demand"),
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: database.DbSession = Depends(get_db),
+):
+    from datetime import datetime
+    return await run_db(
+        db, reorder.suggest, datetime.utcnow().date(), window_days=window_days, lead_time_days=lead_time_days,
+        cover_days=cover_days, service_z=service_z, category=category, limit=limit,
+    )
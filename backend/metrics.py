@@ -0,0 +1,250 @@
+"""
+Request and database instrumentation, exposed as Prometheus text.
+
+MetricsMiddleware times every request by route template. SQLAlchemy engine
+events attribute each SQL statement, and the time spent on it, to the
+request that issued it, through a context variable that follows the request
+into the threadpool and into AsyncSession.run_sync. The same numbers go
+back to the client in a Server-Timing header.
+
+A request that runs the same statement N_PLUS_ONE_THRESHOLD or more times
+is counted and logged as a likely N+1 pattern. Pool checkout wait is
+timed around engine.connect(), which is where a request blocks when the
+pool is exhausted.
+
+Metrics are kept in process; each worker process exposes its own.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+INF_BUCKET = 'le="+Inf"'
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self.values.items())
+        for labels, value in sorted(items):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=()):
+        super().__init__(name, help, labels)
+        self.functions = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function, *labels):
+        """Read the value from `function` at scrape time instead of setting it"""
+        self.functions[labels] = function
+
+    def render(self) -> list:
+        for labels, function in self.functions.items():
+            with self._lock:
+                self.values[labels] = function()
+        return super().render()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self.values.get(labels)
+            if series is None:
+                # Per-bucket counts, then the sum and count of observations
+                series = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self.values.items()]
+        for labels, (counts, total, count) in sorted(items):
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {running}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+requests_total = register(Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+request_duration = register(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+requests_in_flight = register(Gauge("http_requests_in_flight", "HTTP requests being served"))
+requests_in_flight.inc(amount=0)
+db_queries = register(Histogram("db_queries_per_request", "SQL statements per request", ("route",), QUERY_COUNT_BUCKETS))
+db_time = register(Histogram("db_time_per_request_seconds", "Time spent in SQL per request", ("route",)))
+n_plus_one = register(Counter("db_n_plus_one_total", f"Requests that ran one statement {N_PLUS_ONE_THRESHOLD}+ times", ("route",)))
+pool_wait = register(Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",), POOL_WAIT_BUCKETS))
+pool_checked_out = register(Gauge("db_pool_checked_out", "Connections currently checked out", ("engine",)))
+pool_size = register(Gauge("db_pool_size", "Configured pool size", ("engine",)))
+pool_overflow = register(Gauge("db_pool_overflow", "Connections open beyond the pool size", ("engine",)))
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "pool_wait", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.statements = {}
+
+current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+def instrument_engine(engine, name: str):
+    """Attach statement timing and pool wait measurement to a (sync) engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    # Sessions and AsyncConnection both check out through engine.connect();
+    # wrapping it rather than the pool survives engine.dispose() swapping the pool
+    connect = engine.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            waited = time.perf_counter() - started
+            pool_wait.observe(waited, name)
+            stats = current.get()
+            if stats is not None:
+                stats.pool_wait += waited
+
+    engine.connect = timed_connect
+    if hasattr(engine.pool, "checkedout"):  # QueuePool; StaticPool has no counters
+        pool_checked_out.set_function(lambda: engine.pool.checkedout(), name)
+        pool_size.set_function(lambda: engine.pool.size(), name)
+        # QueuePool.overflow() starts at -pool_size and counts up as connections open
+        pool_overflow.set_function(lambda: max(engine.pool.overflow(), 0), name)
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps such as /images expose their prefix as root_path
+    return scope.get("root_path") or "unmatched"
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and adding a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = (
+                    f"app;dur={(time.perf_counter() - started) * 1000:.1f}, "
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                    f"pool;dur={stats.pool_wait * 1000:.1f}"
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            requests_in_flight.dec()
+            current.reset(token)
+            route = _route_label(scope)
+            method = scope["method"]
+            request_duration.observe(time.perf_counter() - started, method, route)
+            requests_total.inc(method, route, str(status))
+            db_queries.observe(stats.queries, route)
+            db_time.observe(stats.db_time, route)
+            repeated = [(sql, count) for sql, count in stats.statements.items() if count >= N_PLUS_ONE_THRESHOLD]
+            if repeated:
+                n_plus_one.inc(route)
+                sql, count = max(repeated, key=lambda pair: pair[1])
+                logger.warning("Possible N+1 on %s %s: statement ran %d times: %s", method, route, count, sql[:200])
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Apply versioned schema migrations to the configured database.
+
+    python migrate.py              apply all pending migrations
+    python migrate.py status       list applied and pending migrations
+    python migrate.py --to 4       apply pending migrations up to version 4
+    python migrate.py --chunk-size 20000
+"""
+
+import argparse
+
+import database
+import migrations
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("command", nargs="?", choices=["up", "status"], default="up")
+    parser.add_argument("--to", type=int, default=None, help="stop after this version")
+    parser.add_argument("--chunk-size", type=int, default=migrations.DEFAULT_CHUNK_SIZE, help="rows per backfill transaction")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        applied = migrations.applied_versions(database.engine)
+        for module in migrations.discover():
+            state = "applied" if module.VERSION in applied else "pending"
+            print(f"{module.VERSION:04d}  {state:8}  {module.DESCRIPTION}")
+        return
+
+    ran = migrations.upgrade(database.engine, target=args.to, chunk_size=args.chunk_size)
+    print(f"{ran} migration(s) applied." if ran else "Database is up to date.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Versioned schema migrations.
+
+Each module in this package named vNNNN_<name>.py defines VERSION,
+DESCRIPTION and upgrade(ctx). Applied versions are recorded in the
+schema_migrations table of the configured database, so `python migrate.py`
+only runs what is pending. Migrations must be safe to re-run: they check
+for existing columns and backfill only rows that still need it.
+
+Backfills go through MigrationContext.chunked_update, which applies one
+set-based statement per id range in its own short transaction. Large
+tables are then never locked for the length of the whole backfill.
+"""
+
+import importlib
+import pkgutil
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+DEFAULT_CHUNK_SIZE = 5000
+
+CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+class MigrationContext:
+    def __init__(self, engine, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.engine = engine
+        self.chunk_size = chunk_size
+
+    @property
+    def dialect(self) -> str:
+        return self.engine.dialect.name
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in [c["name"] for c in inspect(self.engine).get_columns(table)]
+
+    def add_column(self, table: str, column: str, ddl: str) -> bool:
+        """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+        if self.has_column(table, column):
+            print(f"  {table}.{column} already exists, skipping")
+            return False
+        print(f"  Adding {table}.{column}")
+        with self.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        return True
+
+    def create_index(self, name: str, table: str, columns: str, where: str = None, unique: bool = False) -> bool:
+        """CREATE INDEX unless it exists; built CONCURRENTLY on Postgres so writes keep flowing"""
+        if name in [index["name"] for index in inspect(self.engine).get_indexes(table)]:
+            print(f"  {name} already exists, skipping")
+            return False
+        print(f"  Creating {name} on {table} {columns}")
+        started = time.monotonic()
+        concurrently = " CONCURRENTLY" if self.dialect == "postgresql" else ""
+        partial = f" WHERE {where}" if where else ""
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX{concurrently} {name} ON {table} {columns}{partial}"))
+        print(f"  {name} built in {time.monotonic() - started:.1f}s")
+        return True
+
+    def execute(self, sql: str, **params):
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params)
+
+    def chunked_update(self, table: str, sql: str, label: str = None) -> int:
+        """Run `sql` once per id range of `table`, binding :lo and :hi, with progress output"""
+        label = label or table
+        with self.engine.connect() as conn:
+            low, high = conn.execute(text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+        if low is None:
+            print(f"  {label}: nothing to backfill")
+            return 0
+        total = 0
+        started = time.monotonic()
+        for start in range(low, high + 1, self.chunk_size):
+            end = min(start + self.chunk_size - 1, high)
+            with self.engine.begin() as conn:
+                total += conn.execute(text(sql), {"lo": start, "hi": end}).rowcount
+            done = (end - low + 1) / (high - low + 1)
+            print(f"  {label}: ids {start}-{end} ({done:.0%}), {total} rows updated, {time.monotonic() - started:.1f}s")
+        return total
+
+def discover():
+    """All migration modules in version order"""
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if re.match(r"v\d+_", info.name):
+            modules.append(importlib.import_module(f"{__name__}.{info.name}"))
+    modules.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in modules]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return modules
+
+def applied_versions(engine) -> set:
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_VERSION_TABLE))
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def pending(engine) -> list:
+    applied = applied_versions(engine)
+    return [module for module in discover() if module.VERSION not in applied]
+
+def upgrade(engine, target: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Apply pending migrations up to `target` (all by default); returns how many ran"""
+    ctx = MigrationContext(engine, chunk_size)
+    ran = 0
+    for module in pending(engine):
+        if target is not None and module.VERSION > target:
+            break
+        print(f"Applying {module.VERSION:04d}: {module.DESCRIPTION}")
+        started = time.monotonic()
+        module.upgrade(ctx)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, :description, :applied_at)"),
+                {"version": module.VERSION, "description": module.DESCRIPTION, "applied_at": datetime.utcnow()}
+            )
+        print(f"Applied {module.VERSION:04d} in {time.monotonic() - started:.1f}s")
+        ran += 1
+    return ran
@@ -0,0 +1,9 @@
+VERSION = 1
+DESCRIPTION = "Add items.purchase_price, defaulting to the sales price"
+
+def upgrade(ctx):
+    ctx.add_column("items", "purchase_price", "FLOAT")
+    ctx.chunked_update(
+        "items",
+        "UPDATE items SET purchase_price = price WHERE purchase_price IS NULL AND id BETWEEN :lo AND :hi",
+    )
@@ -0,0 +1,20 @@
+VERSION = 2
+DESCRIPTION = "Create customers table"
+
+def upgrade(ctx):
+    if ctx.has_table("customers"):
+        print("  customers already exists, skipping")
+        return
+    primary_key = "SERIAL PRIMARY KEY" if ctx.dialect == "postgresql" else "INTEGER PRIMARY KEY"
+    ctx.execute(f"""
+        CREATE TABLE customers (
+            id {primary_key},
+            name VARCHAR NOT NULL,
+            phone VARCHAR,
+            email VARCHAR,
+            address VARCHAR,
+            customer_type VARCHAR NOT NULL DEFAULT 'regular',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
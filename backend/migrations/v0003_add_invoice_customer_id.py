@@ -0,0 +1,5 @@
+VERSION = 3
+DESCRIPTION = "Add invoices.customer_id"
+
+def upgrade(ctx):
+    ctx.add_column("invoices", "customer_id", "INTEGER REFERENCES customers(id)")
@@ -0,0 +1,24 @@
+VERSION = 4
+DESCRIPTION = "Add payment tracking columns to invoices and backfill totals"
+
+def upgrade(ctx):
+    ctx.add_column("invoices", "total_amount", "FLOAT")
+    ctx.add_column("invoices", "amount_paid", "FLOAT DEFAULT 0.0")
+    ctx.add_column("invoices", "outstanding_balance", "FLOAT")
+    ctx.add_column("invoices", "payment_status", "VARCHAR DEFAULT 'unpaid'")
+    # Invoices created before payment tracking are treated as wholly unpaid
+    ctx.chunked_update(
+        "invoices",
+        """
+        UPDATE invoices
+        SET total_amount = COALESCE((
+                SELECT SUM(ii.price * ii.quantity) FROM invoice_items ii WHERE ii.invoice_id = invoices.id
+            ), 0),
+            amount_paid = 0.0,
+            outstanding_balance = COALESCE((
+                SELECT SUM(ii.price * ii.quantity) FROM invoice_items ii WHERE ii.invoice_id = invoices.id
+            ), 0),
+            payment_status = 'unpaid'
+        WHERE total_amount IS NULL AND id BETWEEN :lo AND :hi
+        """,
+    )
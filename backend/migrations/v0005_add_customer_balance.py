@@ -0,0 +1,19 @@
+VERSION = 5
+DESCRIPTION = "Add stored customers.outstanding_balance and backfill it"
+
+def upgrade(ctx):
+    ctx.add_column("customers", "outstanding_balance", "FLOAT NOT NULL DEFAULT 0")
+    # Same attribution as crud: by customer_id, plus legacy invoices matched by name
+    ctx.chunked_update(
+        "customers",
+        """
+        UPDATE customers
+        SET outstanding_balance = COALESCE((
+                SELECT SUM(i.outstanding_balance) FROM invoices i WHERE i.customer_id = customers.id
+            ), 0) + COALESCE((
+                SELECT SUM(i.outstanding_balance) FROM invoices i
+                WHERE i.customer_id IS NULL AND i.client_name = customers.name
+            ), 0)
+        WHERE id BETWEEN :lo AND :hi
+        """,
+    )
@@ -0,0 +1,18 @@
+VERSION = 6
+DESCRIPTION = "Create daily_sales_summary, payments and table_versions; backfill the sales rollup"
+
+def upgrade(ctx):
+    from sqlalchemy.orm import Session
+    import crud
+    from models import Base, DailySalesSummary, Payment, TableVersion
+
+    rollup_exists = ctx.has_table("daily_sales_summary")
+    tables = [DailySalesSummary.__table__, Payment.__table__, TableVersion.__table__]
+    Base.metadata.create_all(ctx.engine, tables=tables, checkfirst=True)
+    if not rollup_exists and not ctx.has_column("invoice_items", "purchase_price"):
+        # crud's rebuild reads the line cost and category snapshots; 0010 adds them and builds the rollup
+        print("  daily_sales_summary: backfill deferred to 0010")
+    elif not rollup_exists:
+        with Session(ctx.engine) as db:
+            rows = crud.rebuild_daily_sales_summary(db)
+        print(f"  daily_sales_summary: {rows} rows built")
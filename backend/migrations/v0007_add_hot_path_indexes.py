@@ -0,0 +1,21 @@
+VERSION = 7
+DESCRIPTION = "Index invoice, invoice line, payment and customer lookups"
+
+INDEXES = [
+    ("ix_invoices_created_at_id", "invoices", "(created_at, id)", None),
+    ("ix_invoices_customer_id_created_at", "invoices", "(customer_id, created_at)", None),
+    ("ix_invoices_client_name", "invoices", "(client_name)", None),
+    ("ix_invoices_open_by_customer", "invoices", "(customer_id, created_at)", "outstanding_balance > 0"),
+    ("ix_invoice_items_invoice_id", "invoice_items", "(invoice_id)", None),
+    ("ix_invoice_items_item_id", "invoice_items", "(item_id)", None),
+    ("ix_payments_customer_id", "payments", "(customer_id)", None),
+    ("ix_payments_invoice_id", "payments", "(invoice_id)", None),
+    ("ix_customers_name", "customers", "(name)", None),
+]
+
+def upgrade(ctx):
+    for name, table, columns, where in INDEXES:
+        ctx.create_index(name, table, columns, where)
+    # Fresh statistics so the planner actually considers the new indexes
+    for table in sorted({table for _, table, _, _ in INDEXES}):
+        ctx.execute(f"ANALYZE {table}")
@@ -0,0 +1,6 @@
+VERSION = 8
+DESCRIPTION = "Add invoices.idempotency_key with a unique index"
+
+def upgrade(ctx):
+    ctx.add_column("invoices", "idempotency_key", "VARCHAR")
+    ctx.create_index("ix_invoices_idempotency_key", "invoices", "(idempotency_key)", unique=True)
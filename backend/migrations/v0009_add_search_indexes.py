@@ -0,0 +1,19 @@
+VERSION = 9
+DESCRIPTION = "Add trigram (Postgres) or FTS5 (SQLite) search indexes for items and customers"
+
+def upgrade(ctx):
+    import search_index
+
+    if ctx.dialect == "postgresql":
+        if not search_index.create_trigram_extension(ctx.engine):
+            print("  Skipping trigram indexes")
+            return
+        for name, table, column in search_index.TRIGRAM_INDEXES:
+            ctx.create_index(name, table, f"USING gin ({column} gin_trgm_ops)")
+        for table in search_index.SEARCHED:
+            ctx.execute(f"ANALYZE {table}")
+    elif ctx.dialect == "sqlite":
+        created = search_index.create_fts(ctx.engine)
+        for table in search_index.SEARCHED:
+            name = search_index.fts_table(table)
+            print(f"  {name} {'built' if name in created else 'already exists, skipping'}")
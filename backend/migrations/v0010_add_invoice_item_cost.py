@@ -0,0 +1,37 @@
+VERSION = 10
+DESCRIPTION = "Snapshot item cost and category on invoice lines and add cost to the daily sales rollup"
+
+def upgrade(ctx):
+    from sqlalchemy.orm import Session
+    import crud
+
+    ctx.add_column("invoice_items", "purchase_price", "FLOAT")
+    ctx.add_column("invoice_items", "category", "VARCHAR")
+    # The cost at time of sale was never recorded; today's cost is the best estimate
+    backfilled = ctx.chunked_update(
+        "invoice_items",
+        "UPDATE invoice_items SET purchase_price = "
+        "(SELECT items.purchase_price FROM items WHERE items.id = invoice_items.item_id) "
+        "WHERE purchase_price IS NULL AND id BETWEEN :lo AND :hi",
+        label="invoice_items.purchase_price",
+    )
+    # The rollup recorded the category at time of sale per day and item; use it where it
+    # is unambiguous and fall back to the item's current category
+    backfilled += ctx.chunked_update(
+        "invoice_items",
+        "UPDATE invoice_items SET category = COALESCE("
+        "(SELECT CASE WHEN COUNT(DISTINCT d.category) = 1 THEN MIN(d.category) END "
+        "FROM invoices i JOIN daily_sales_summary d "
+        "ON d.sale_date = DATE(i.created_at) AND d.item_id = invoice_items.item_id "
+        "WHERE i.id = invoice_items.invoice_id), "
+        "(SELECT items.category FROM items WHERE items.id = invoice_items.item_id)) "
+        "WHERE category IS NULL AND id BETWEEN :lo AND :hi",
+        label="invoice_items.category",
+    )
+    added = ctx.add_column("daily_sales_summary", "cost", "FLOAT NOT NULL DEFAULT 0")
+    # Also rebuild when a previous run stopped before the rollup was rebuilt
+    missing = ctx.execute("SELECT 1 FROM daily_sales_summary WHERE cost = 0 AND revenue > 0 LIMIT 1").first()
+    if added or backfilled or missing:
+        with Session(ctx.engine) as db:
+            rows = crud.rebuild_daily_sales_summary(db)
+        print(f"  daily_sales_summary: {rows} rows rebuilt from invoice lines")
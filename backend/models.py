@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from sqlalchemy.orm import relationship
+import image_names
 
 Base = declarative_base()
 
@@ -18,6 +19,10 @@ class Item(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    @property
+    def thumbnail_filename(self):
+        return image_names.thumbnail_name(self.image_filename)
+
 class Customer(Base):
     __tablename__ = "customers"
     id = Column(Integer, primary_key=True, index=True)
@@ -26,10 +31,15 @@ class Customer(Base):
     email = Column(String, nullable=True)
     address = Column(String, nullable=True)
     customer_type = Column(String, nullable=False, default="regular")  # "regular" or "walk-in"
+    outstanding_balance = Column(Float, nullable=False, default=0.0)  # Sum of unpaid invoice balances, kept in sync by crud
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     invoices = relationship("Invoice", back_populates="customer", lazy="select")
 
+    __table_args__ = (
+        Index("ix_customers_name", "name"),  # Legacy invoices are matched to customers by name
+    )
+
 class Invoice(Base):
     __tablename__ = "invoices"
     id = Column(Integer, primary_key=True, index=True)
@@ -42,8 +52,23 @@ class Invoice(Base):
     amount_paid = Column(Float, nullable=True, default=0.0)  # Amount customer paid
     outstanding_balance = Column(Float, nullable=True)  # Remaining balance
     payment_status = Column(String, nullable=True, default="unpaid")  # paid, partial, unpaid
-    customer = relationship("Customer", back_populates="invoices", lazy="joined")
-    items = relationship("InvoiceItem", back_populates="invoice", lazy="joined")
+    idempotency_key = Column(String, nullable=True)  # Client-chosen, so a retried submission is not applied twice
+    # Lines are loaded with a separate IN query rather than a wide join; crud.invoice_load_options
+    # picks the strategy per query
+    customer = relationship("Customer", back_populates="invoices", lazy="select")
+    items = relationship("InvoiceItem", back_populates="invoice", lazy="selectin", order_by="InvoiceItem.id")
+
+    # Created by migration 0007 on existing databases; tests/test_query_plans.py guards their use
+    __table_args__ = (
+        Index("ix_invoices_created_at_id", "created_at", "id"),
+        Index("ix_invoices_customer_id_created_at", "customer_id", "created_at"),
+        Index("ix_invoices_client_name", "client_name"),
+        Index("ix_invoices_idempotency_key", "idempotency_key", unique=True),
+        Index(
+            "ix_invoices_open_by_customer", "customer_id", "created_at",
+            postgresql_where=outstanding_balance > 0, sqlite_where=outstanding_balance > 0
+        ),
+    )
 
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
@@ -52,5 +77,50 @@ class InvoiceItem(Base):
     item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)  # Price at time of sale
+    purchase_price = Column(Float, nullable=False)  # Item cost at time of sale
+    category = Column(String, nullable=False)  # Item category at time of sale
     invoice = relationship("Invoice", back_populates="items")
-    item = relationship("Item", lazy="joined") 
\ No newline at end of file
+    item = relationship("Item", lazy="selectin")
+
+    __table_args__ = (
+        Index("ix_invoice_items_invoice_id", "invoice_id"),
+        Index("ix_invoice_items_item_id", "item_id"),
+    )
+
+    @property
+    def product_name(self):
+        return self.item.name if self.item else None
+
+    @property
+    def product_code(self):
+        return self.item.product_code if self.item else None
+
+class Payment(Base):
+    """Ledger of amounts applied to invoices; negative amounts are corrections"""
+    __tablename__ = "payments"
+    id = Column(Integer, primary_key=True, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)  # Null for walk-in invoices
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_payments_customer_id", "customer_id"),
+        Index("ix_payments_invoice_id", "invoice_id"),
+    )
+
+class DailySalesSummary(Base):
+    """Per-day, per-item sales rollup maintained by crud.create_invoice"""
+    __tablename__ = "daily_sales_summary"
+    sale_date = Column(Date, primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+    category = Column(String, primary_key=True)  # Item category at time of sale
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    cost = Column(Float, nullable=False, default=0.0)  # quantity x purchase_price at time of sale
+
+class TableVersion(Base):
+    """Write counter per table, used for ETags on list endpoints"""
+    __tablename__ = "table_versions"
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Rebuild the daily_sales_summary rollup from invoice history.
+
+Run once after deploying the rollup table, or any time the rollup is
+suspected to be out of sync. Optionally limit the rebuild to a date range:
+
+    python rebuild_daily_sales_summary.py [START YYYY-MM-DD] [END YYYY-MM-DD]
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+import crud, database
+
+def rebuild(start=None, end=None):
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        print("Rebuilding daily sales summary...")
+        rows = crud.rebuild_daily_sales_summary(db, start=start, end=end)
+        print(f"Rebuilt {rows} daily sales summary rows.")
+    except Exception as e:
+        print(f"Error rebuilding daily sales summary: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    start = datetime.strptime(sys.argv[1], "%Y-%m-%d") if len(sys.argv) > 1 else None
+    end = datetime.strptime(sys.argv[2], "%Y-%m-%d") + timedelta(days=1) if len(sys.argv) > 2 else None
+    rebuild(start, end)
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Reconcile the stored customers.outstanding_balance column with invoices.
+
+Balances are kept in sync by the crud functions; run this periodically
+(e.g. nightly) or after editing invoices directly in the database.
+"""
+
+import crud, database
+
+def reconcile():
+    db = database.SessionLocal()
+    try:
+        print("Reconciling customer balances...")
+        updated = crud.reconcile_customer_balances(db)
+        print(f"Reconciled {updated} customer balances.")
+    except Exception as e:
+        print(f"Error reconciling customer balances: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    reconcile()
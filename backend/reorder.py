@@ -0,0 +1,116 @@
+"""
+Stock velocity and reorder suggestions for the whole catalog.
+
+Per-item daily unit sales for the last `window_days` complete days are
+read from the daily_sales_summary rollup (itself built from invoice_items)
+into an items x days NumPy matrix. Every item is then scored in one
+vectorized pass:
+
+    velocity        mean units sold per day over the window
+    recent_velocity mean over the last RECENT_DAYS days, to show trend
+    days_of_cover   quantity / velocity
+    reorder_point   velocity * lead_time + safety stock, where safety stock
+                    is z * std(daily sales) * sqrt(lead_time)
+    suggested       enough to cover lead time plus `cover_days` of demand
+                    and the safety stock, less what is on hand
+
+Items that have not sold in the window get no suggestion.
+"""
+
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+RECENT_DAYS = 7
+# z-score for the service level the safety stock is sized for (1.65 ~ 95%)
+DEFAULT_SERVICE_Z = 1.65
+
+def _daily_sales(db: Session, item_ids: np.ndarray, first: date, days: int) -> np.ndarray:
+    """Units sold per item (rows, in item_ids order) per day (columns) from `first`"""
+    from models import DailySalesSummary
+    # Core rows rather than ORM query: no per-row entity bookkeeping
+    rows = db.execute(
+        select(DailySalesSummary.item_id, DailySalesSummary.sale_date, func.sum(DailySalesSummary.quantity))
+        .where(DailySalesSummary.sale_date >= first, DailySalesSummary.sale_date < first + timedelta(days=days))
+        .group_by(DailySalesSummary.item_id, DailySalesSummary.sale_date)
+    ).all()
+    sales = np.zeros((len(item_ids), days))
+    if not rows:
+        return sales
+    ids, days_sold, units = zip(*rows)
+    ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+    column = {first + timedelta(days=offset): offset for offset in range(days)}
+    offsets = np.fromiter((column[day] for day in days_sold), dtype=np.int64, count=len(rows))
+    positions = np.searchsorted(item_ids, ids)
+    # Sales of items deleted since are dropped
+    known = (positions < len(item_ids)) & (item_ids[np.minimum(positions, len(item_ids) - 1)] == ids)
+    np.add.at(sales, (positions[known], offsets[known]), np.fromiter(units, dtype=np.float64, count=len(rows))[known])
+    return sales
+
+def suggest(
+    db: Session,
+    today: date,
+    window_days: int = 28,
+    lead_time_days: int = 7,
+    cover_days: int = 30,
+    service_z: float = DEFAULT_SERVICE_Z,
+    category: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> dict:
+    """Score every item and return those that should be reordered, most urgent first"""
+    from models import Item
+    query = select(Item.id, Item.name, Item.product_code, Item.category, Item.quantity, Item.purchase_price).order_by(Item.id)
+    if category is not None:
+        query = query.where(Item.category == category)
+    items = db.execute(query).all()
+    first = today - timedelta(days=window_days)
+    result = {
+        "as_of": today,
+        "window_days": window_days,
+        "lead_time_days": lead_time_days,
+        "cover_days": cover_days,
+        "items_analysed": len(items),
+        "suggestions": [],
+    }
+    if not items:
+        return result
+
+    ids, names, codes, categories, quantity, cost = zip(*items)
+    ids = np.array(ids, dtype=np.int64)
+    quantity = np.array(quantity, dtype=np.float64)
+    cost = np.array(cost, dtype=np.float64)
+    sales = _daily_sales(db, ids, first, window_days)
+
+    velocity = sales.mean(axis=1)
+    recent_velocity = sales[:, -min(RECENT_DAYS, window_days):].mean(axis=1)
+    safety_stock = service_z * sales.std(axis=1) * np.sqrt(lead_time_days)
+    reorder_point = velocity * lead_time_days + safety_stock
+    target = velocity * (lead_time_days + cover_days) + safety_stock
+    suggested = np.where(quantity <= reorder_point, np.ceil(np.maximum(target - quantity, 0)), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(velocity > 0, quantity / velocity, np.inf)
+
+    selected = np.flatnonzero((suggested > 0) & (velocity > 0))
+    selected = selected[np.lexsort((ids[selected], days_of_cover[selected]))]
+    if limit is not None:
+        selected = selected[:limit]
+    result["suggestions"] = [
+        {
+            "item_id": int(ids[i]),
+            "name": names[i],
+            "product_code": codes[i],
+            "category": categories[i],
+            "quantity": int(quantity[i]),
+            "velocity": round(float(velocity[i]), 3),
+            "recent_velocity": round(float(recent_velocity[i]), 3),
+            "days_of_cover": round(float(days_of_cover[i]), 1),
+            "reorder_point": round(float(reorder_point[i]), 1),
+            "suggested_quantity": int(suggested[i]),
+            "estimated_cost": round(float(suggested[i] * cost[i]), 2),
+        }
+        for i in selected
+    ]
+    return result
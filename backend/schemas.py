@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 
 class ItemBase(BaseModel):
     name: str
@@ -29,6 +29,7 @@ class ItemResponse(BaseModel):
     product_code: str
     category: str
     image_filename: Optional[str] = None
+    thumbnail_filename: Optional[str] = None  # Small WebP variant, for grids
     quantity: int
     created_at: datetime
     updated_at: datetime
@@ -36,6 +37,17 @@ class ItemResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ItemImportError(BaseModel):
+    row: int  # 1-based data row, not counting a CSV header
+    product_code: Optional[str] = None
+    error: str
+
+class ItemImportResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    errors: List[ItemImportError]  # Capped; `failed` has the full count
+
 class CustomerBase(BaseModel):
     name: str
     phone: Optional[str] = None
@@ -66,6 +78,10 @@ class CustomerResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CustomerBalance(BaseModel):
+    customer_id: int
+    outstanding_balance: float
+
 class InvoiceItemCreate(BaseModel):
     productId: int
     quantity: int
@@ -80,6 +96,17 @@ class InvoiceCreate(BaseModel):
     amount_paid: Optional[float] = 0.0
     outstanding_balance: Optional[float] = None
     payment_status: Optional[str] = "unpaid"
+    idempotency_key: Optional[str] = None  # Resubmitting with the same key returns the original invoice
+
+class InvoiceBatchCreate(BaseModel):
+    invoices: List[InvoiceCreate]
+
+class InvoiceBatchResult(BaseModel):
+    index: int  # Position in the submitted batch
+    idempotency_key: Optional[str] = None
+    status: str  # created, duplicate or failed
+    invoice_id: Optional[int] = None
+    error: Optional[str] = None
 
 class SalesTrackerEntry(BaseModel):
     date: datetime
@@ -88,6 +115,30 @@ class SalesTrackerEntry(BaseModel):
     quantity: int
     revenue: float 
 
+class SalesTrackerBucket(BaseModel):
+    # Only the fields named in group_by are populated
+    day: Optional[date] = None
+    month: Optional[str] = None  # YYYY-MM
+    category: Optional[str] = None
+    item_id: Optional[int] = None
+    product_name: Optional[str] = None
+    quantity: int
+    revenue: float
+    active_days: int
+
+class MarginBucket(BaseModel):
+    # Only the fields named in group_by are populated
+    day: Optional[date] = None
+    month: Optional[str] = None  # YYYY-MM
+    category: Optional[str] = None
+    item_id: Optional[int] = None
+    product_name: Optional[str] = None
+    quantity: int
+    revenue: float
+    cost: float  # At purchase prices recorded when each line was sold
+    margin: float
+    margin_percent: Optional[float] = None  # Of revenue; None when revenue is 0
+
 class InvoiceItemResponse(BaseModel):
     id: int
     item_id: int
@@ -113,6 +164,32 @@ class InvoiceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class InvoiceLineCompact(BaseModel):
+    id: int
+    item_id: int
+    quantity: int
+    price: float
+    product_name: Optional[str] = None
+    product_code: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class InvoiceCompactResponse(BaseModel):
+    id: int
+    created_at: datetime
+    customer_id: Optional[int] = None
+    client_name: str
+    client_phone: Optional[str] = None
+    total_amount: Optional[float] = None
+    amount_paid: Optional[float] = None
+    outstanding_balance: Optional[float] = None
+    payment_status: Optional[str] = None
+    items: list[InvoiceLineCompact]
+
+    class Config:
+        from_attributes = True
+
 # Payment update schema
 class PaymentUpdate(BaseModel):
     amount_paid: float
@@ -122,6 +199,73 @@ class CustomerPayment(BaseModel):
     customer_id: int
     payment_amount: float
 
+class PaymentResponse(BaseModel):
+    id: int
+    customer_id: Optional[int] = None
+    invoice_id: int
+    amount: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Invoice customer assignment
 class InvoiceCustomerAssignment(BaseModel):
-    customer_id: int
\ No newline at end of file
+    customer_id: int
+# Dashboard summary
+class SalesTotals(BaseModel):
+    revenue: float
+    units: int
+
+class DashboardInvoice(BaseModel):
+    id: int
+    created_at: datetime
+    client_name: str
+    total_amount: float
+    payment_status: Optional[str] = None
+
+class DashboardLowStockItem(BaseModel):
+    id: int
+    name: str
+    product_code: str
+    category: str
+    quantity: int
+
+class DashboardSummary(BaseModel):
+    generated_at: datetime
+    # Sales periods are UTC calendar days; the week starts on Monday
+    today: SalesTotals
+    yesterday: SalesTotals
+    week: SalesTotals
+    month: SalesTotals
+    previous_month: SalesTotals
+    item_count: int
+    stock_units: int
+    low_stock_threshold: int
+    low_stock_count: int
+    low_stock_items: List[DashboardLowStockItem]
+    inventory_value_cost: float
+    inventory_value_retail: float
+    recent_invoices: List[DashboardInvoice]
+
+# Reorder suggestions
+class ReorderSuggestion(BaseModel):
+    item_id: int
+    name: str
+    product_code: str
+    category: str
+    quantity: int
+    velocity: float  # Mean units sold per day over the window
+    recent_velocity: float  # Mean units sold per day over the last week
+    days_of_cover: float  # Days the current quantity lasts at `velocity`
+    reorder_point: float
+    suggested_quantity: int
+    estimated_cost: float  # suggested_quantity at purchase price
+
+class ReorderReport(BaseModel):
+    as_of: date
+    window_days: int
+    lead_time_days: int
+    cover_days: int
+    items_analysed: int
+    suggestions: List[ReorderSuggestion]
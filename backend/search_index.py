@@ -0,0 +1,86 @@
+"""
+Indexes behind /items/search and /customers/search.
+
+Postgres gets pg_trgm GIN indexes on each searched column; they serve both
+ILIKE '%term%' and the word-similarity operator used for fuzzy matches.
+They are built only by migration 0009, CONCURRENTLY, never at startup.
+SQLite gets an external-content FTS5 table per searched table, using the
+trigram tokenizer so substrings match. Triggers keep each FTS5 table in
+step with its source table.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Searched columns per table, in the order crud ranks matches
+SEARCHED = {
+    "items": ("product_code", "name", "category"),
+    "customers": ("name", "phone", "email"),
+}
+
+TRIGRAM_INDEXES = [
+    (f"ix_{table}_{column}_trgm", table, column)
+    for table, columns in SEARCHED.items()
+    for column in columns
+]
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+def _fts_statements(table: str) -> list:
+    fts = fts_table(table)
+    columns = SEARCHED[table]
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END",
+        # Index the rows that predate the table
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def create_fts(engine) -> list:
+    """Create and fill the SQLite FTS5 tables that do not exist yet; returns their names"""
+    created = []
+    with engine.begin() as conn:
+        for table in SEARCHED:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_table(table)}
+            ).first()
+            if exists:
+                continue
+            for statement in _fts_statements(table):
+                conn.execute(text(statement))
+            created.append(fts_table(table))
+    return created
+
+def create(engine):
+    """Create the SQLite FTS5 tables if they are missing; Postgres indexes come from migrations"""
+    if engine.dialect.name == "sqlite":
+        for name in create_fts(engine):
+            print(f"Built search table {name}")
+
+def create_trigram_extension(engine) -> bool:
+    """CREATE EXTENSION pg_trgm; False if the database does not allow it"""
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError as e:
+        # Managed databases may not allow the extension; search then falls back to plain ILIKE
+        print(f"  pg_trgm not available, search falls back to ILIKE: {e.orig}")
+        return False
+    return True
+
+_trigram = {}
+
+def trigram_available(db) -> bool:
+    """Whether pg_trgm is installed, checked once per engine"""
+    engine = db.get_bind()
+    if engine not in _trigram:
+        _trigram[engine] = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+    return _trigram[engine]
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Slow-query log.
+
+Off unless SLOW_QUERY_MS is set; database.py then installs it on every
+engine it creates. Any statement taking at least SLOW_QUERY_MS is written as one JSON line to a rotating log with
+its bound parameters, duration, the application function that issued it
+and the plan the database chooses for it. The plan comes from EXPLAIN
+(FORMAT JSON) on Postgres and EXPLAIN QUERY PLAN on SQLite.
+
+With SLOW_QUERY_ANALYZE=1, slow SELECTs are explained with ANALYZE, which
+runs them a second time. Writes are never re-run.
+
+Summarize the log, worst total time first:
+
+    python slow_query_log.py
+    python slow_query_log.py --sort max --top 10 slow_queries.log.1 slow_queries.log
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+DEFAULT_PATH = "./slow_queries.log"
+# Bound parameter rows kept per entry for executemany statements
+MAX_PARAM_ROWS = 5
+MAX_PARAM_LENGTH = 200
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Frames from these files are the plumbing around a query, not its caller
+_SKIP_FILES = {"database.py", "slow_query_log.py", "metrics.py"}
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger("slow_queries")
+logger.propagate = False
+
+def configure(path: str = DEFAULT_PATH, max_bytes: int = 10 * 1024 * 1024, backups: int = 5):
+    """Send the slow-query logger to a rotating file (once per process)"""
+    if logger.handlers:
+        return
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+def _short(value):
+    text = value if isinstance(value, str) else repr(value) if isinstance(value, (bytes, bytearray)) else value
+    if isinstance(text, str) and len(text) > MAX_PARAM_LENGTH:
+        return text[:MAX_PARAM_LENGTH] + "..."
+    return text
+
+def _params(parameters, executemany: bool):
+    if executemany:
+        rows = list(parameters[:MAX_PARAM_ROWS])
+        return {"rows": len(parameters), "first": [_params(row, False) for row in rows]}
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    return [_short(value) for value in parameters or ()]
+
+def _caller() -> str:
+    """The innermost application function on the stack, preferring crud.py"""
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        path = frame.f_code.co_filename
+        name = os.path.basename(path)
+        if os.path.dirname(os.path.abspath(path)) == _BACKEND_DIR and name not in _SKIP_FILES:
+            where = f"{name[:-3]}.{frame.f_code.co_name} ({name}:{frame.f_lineno})"
+            if name == "crud.py":
+                return where
+            fallback = fallback or where
+        frame = frame.f_back
+    return fallback or "unknown"
+
+def _explain(conn, statement: str, parameters, analyze: bool):
+    """Plan for `statement`, run on the same DBAPI connection outside SQLAlchemy's events"""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if keyword not in EXPLAINABLE:
+        return None
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze and keyword == "SELECT" else "FORMAT JSON"
+        prefix = f"EXPLAIN ({options}) "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    explain_cursor = conn.connection.cursor()
+    try:
+        # A failed EXPLAIN must not abort the request's Postgres transaction
+        if dialect == "postgresql":
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            rows = explain_cursor.fetchall()
+        finally:
+            if dialect == "postgresql":
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    except Exception as e:
+        return {"error": str(e)[:MAX_PARAM_LENGTH]}
+    finally:
+        explain_cursor.close()
+    if dialect == "postgresql":
+        plan = rows[0][0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+    return [row[-1] for row in rows]
+
+def install(engine, threshold_ms: float, analyze: bool = False):
+    """Log statements on `engine` (a sync Engine) that take threshold_ms or longer"""
+    threshold = threshold_ms / 1000
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["slow_query_started"].pop()
+        if duration < threshold:
+            return
+        logger.info(json.dumps({
+            "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration * 1000, 1),
+            "caller": _caller(),
+            "statement": statement,
+            "params": _params(parameters, executemany),
+            "plan": None if executemany else _explain(conn, statement, parameters, analyze),
+        }, default=str))
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+def _read(paths):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def summarize(entries, sort: str = "total") -> list:
+    """Group entries by statement text and total their durations"""
+    groups = {}
+    for entry in entries:
+        key = re.sub(r"\s+", " ", entry["statement"]).strip()
+        group = groups.setdefault(key, {"statement": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "callers": set(), "slowest": None})
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["callers"].add(entry.get("caller", "unknown"))
+        if entry["duration_ms"] >= group["max_ms"]:
+            group["max_ms"] = entry["duration_ms"]
+            group["slowest"] = entry
+    key = {"total": "total_ms", "max": "max_ms", "count": "count"}[sort]
+    return sorted(groups.values(), key=lambda group: group[key], reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the slow-query log, worst statements first")
+    parser.add_argument("paths", nargs="*", help=f"log files (default {DEFAULT_PATH} from SLOW_QUERY_LOG)")
+    parser.add_argument("--sort", choices=["total", "max", "count"], default="total")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--plans", action="store_true", help="print the plan of each statement's slowest run")
+    args = parser.parse_args()
+
+    paths = args.paths or [os.getenv("SLOW_QUERY_LOG", DEFAULT_PATH)]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        sys.exit(f"No such log file: {', '.join(missing)}")
+    groups = summarize(_read(paths), args.sort)
+    if not groups:
+        print("No slow queries logged.")
+        return
+
+    print(f"{'total ms':>10} {'count':>6} {'mean ms':>9} {'max ms':>9}  statement")
+    for group in groups[:args.top]:
+        mean = group["total_ms"] / group["count"]
+        statement = group["statement"] if len(group["statement"]) <= 120 else group["statement"][:117] + "..."
+        print(f"{group['total_ms']:10.1f} {group['count']:6d} {mean:9.1f} {group['max_ms']:9.1f}  {statement}")
+        print(f"{'':38}from {', '.join(sorted(group['callers']))}")
+        if args.plans and group["slowest"].get("plan") is not None:
+            print(f"{'':38}params {json.dumps(group['slowest']['params'], default=str)}")
+            for line in json.dumps(group["slowest"]["plan"], indent=2).splitlines():
+                print(f"{'':38}{line}")
+
+if __name__ == "__main__":
+    main()
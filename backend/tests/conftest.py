@@ -0,0 +1,34 @@
+"""Run the app against a throwaway SQLite database."""
+
+import os
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp()
+os.environ.update(DB_BACKEND="sqlite", SQLITE_PATH=os.path.join(_db_dir, "test.db"), SLOW_QUERY_MS="0")
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("DB_ASYNC", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def sell(client):
+    """Create an invoice for `quantity` of an item, restocking it first; a paid walk-in sale unless overridden"""
+    def sell(item_id: int, quantity: int = 1, **invoice):
+        client.put(f"/items/{item_id}", data={"quantity": 100})
+        response = client.post("/invoices", json={
+            "lines": [{"productId": item_id, "quantity": quantity}], "client_name": "Walk-in",
+            "total_amount": 0, "amount_paid": 0, "outstanding_balance": 0, "payment_status": "paid",
+            **invoice,
+        })
+        assert response.status_code == 200
+        return response.json()
+    return sell
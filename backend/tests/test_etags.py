@@ -0,0 +1,26 @@
+"""ETags on the invoice listings must change when an item they show changes."""
+
+from datetime import datetime
+
+import pytest
+
+@pytest.mark.parametrize("path", ["/invoices/by-date", "/invoices"])
+@pytest.mark.parametrize("compact", ["false", "true"])
+def test_item_rename_invalidates_invoice_etag(client, sell, path, compact):
+    sell(1)
+    params = {"compact": compact}
+    if path == "/invoices/by-date":
+        params["date"] = datetime.utcnow().strftime("%Y-%m-%d")
+    first = client.get(path, params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert client.get(path, params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    new_name = f"Renamed {path} {compact}"
+    assert client.put("/items/1", data={"name": new_name}).status_code == 200
+
+    again = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 200
+    # The full view nests the item; the compact one carries its name
+    names = [line.get("product_name") or line["item"]["name"] for invoice in again.json() for line in invoice["items"]]
+    assert new_name in names
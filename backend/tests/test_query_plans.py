@@ -0,0 +1,103 @@
+"""
+Query plan regression tests for the hot crud paths.
+
+Each hot path is run once while its SQL is captured, and every statement
+is EXPLAINed. A test fails when a statement reads one of the path's tables
+with a sequential scan, which usually means an index from models.py is
+missing or no longer usable. The test tables are tiny, so on Postgres
+enable_seqscan is switched off for the EXPLAINs.
+"""
+
+import json
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import crud, database, schemas
+
+HOT_PATHS = {
+    # name -> (crud call, tables that must not be sequentially scanned)
+    "invoices by date": (lambda db, ids: crud.get_invoices(db, start=ids["start"], end=ids["end"]), {"invoices", "invoice_items"}),
+    "invoices by customer": (lambda db, ids: crud.get_invoices(db, customer_id=ids["customer"]), {"invoices", "invoice_items"}),
+    "invoice page": (lambda db, ids: crud.get_invoices(db, before=(ids["end"], ids["invoice"]), limit=50, compact=True), {"invoice_items"}),
+    "customer balance recompute": (lambda db, ids: crud._recompute_customer_balances(db, ids["customer"]), {"invoices", "customers"}),
+    "customer payments": (lambda db, ids: crud.get_payments(db, customer_id=ids["customer"]), {"payments"}),
+    "invoice payments": (lambda db, ids: crud.get_payments(db, invoice_id=ids["invoice"]), {"payments"}),
+    "sales tracker": (lambda db, ids: crud.get_sales_tracker(db, start=ids["start"], end=ids["end"]), {"invoices", "invoice_items"}),
+    "sales summary": (lambda db, ids: crud.get_sales_tracker_summary(db, ["day"], start=ids["start"], end=ids["end"]), {"daily_sales_summary"}),
+    "margin report": (lambda db, ids: crud.get_margin_report(db, ["day"], start=ids["start"], end=ids["end"]), {"daily_sales_summary"}),
+    "customer payment allocation": (lambda db, ids: crud.process_customer_payment(
+        db, schemas.CustomerPayment(customer_id=ids["customer"], payment_amount=1.0)
+    ), {"invoices", "customers"}),
+}
+
+@pytest.fixture(scope="module")
+def ids(client, sell):
+    """A customer with an open invoice and a payment, so every hot path issues its queries"""
+    customer = client.post("/customers", json={"name": "Plan check"}).json()
+    invoice = sell(3, customer_id=customer["id"], client_name=customer["name"], total_amount=2500,
+                   outstanding_balance=2500, payment_status="unpaid")
+    response = client.post(f"/customers/{customer['id']}/payment", json={"customer_id": customer["id"], "payment_amount": 100})
+    assert response.status_code == 200
+    now = datetime.utcnow()
+    return {"customer": customer["id"], "invoice": invoice["invoice_id"], "start": now - timedelta(days=30), "end": now + timedelta(days=1)}
+
+def _sqlite_scans(conn, statement, parameters) -> list:
+    plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()]
+    # "SCAN t" reads the whole table; "SCAN t USING INDEX" and "SEARCH t ..." do not
+    return [detail.split()[1] for detail in plan if detail.startswith("SCAN ") and "USING" not in detail]
+
+def _postgres_scans(conn, statement, parameters) -> list:
+    raw = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    scanned = []
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan":
+            scanned.append(node.get("Relation Name"))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return scanned
+
+def _table_of(name: str, tables: set):
+    """SQLite reports aliases such as invoices_1; map them back to the table"""
+    for table in tables:
+        if name == table or re.fullmatch(rf"{table}_\d+", name):
+            return table
+    return None
+
+@pytest.mark.parametrize("name", list(HOT_PATHS))
+def test_hot_path_uses_indexes(ids, name):
+    call, tables = HOT_PATHS[name]
+    engine = database.engine
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)", statement, re.I):
+            captured.append((statement, parameters))
+
+    db = database.SessionLocal()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call(db, ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+        db.close()
+
+    postgres = engine.dialect.name == "postgresql"
+    explain = _postgres_scans if postgres else _sqlite_scans
+    with engine.connect() as conn:
+        if postgres:
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        scans = [
+            (table, statement.strip())
+            for statement, parameters in captured
+            for table in sorted({_table_of(scanned, tables) for scanned in explain(conn, statement, parameters)} - {None})
+        ]
+        conn.rollback()
+    assert captured, f"{name} issued no queries"
+    assert not scans, f"{name} fell back to a sequential scan: {scans}"
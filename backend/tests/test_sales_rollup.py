@@ -0,0 +1,37 @@
+"""Sales rollup and export figures must keep each line's category and cost at the time of sale."""
+
+import json
+
+import crud
+import database
+
+def _by_category(client):
+    rows = client.get("/sales-tracker", params={"group_by": "category"}).json()
+    return {row["category"]: (row["quantity"], row["revenue"]) for row in rows}
+
+def test_rebuild_keeps_category_at_time_of_sale(client, sell):
+    item = client.get("/items/2").json()
+    sell(2, quantity=3)
+    assert client.put("/items/2", data={"category": "Recategorised"}).status_code == 200
+    sell(2, quantity=2)
+
+    incremental = _by_category(client)
+    assert incremental["Recategorised"] == (2, 2 * item["price"])
+    assert incremental[item["category"]][0] >= 3
+
+    db = database.SessionLocal()
+    try:
+        crud.rebuild_daily_sales_summary(db)
+    finally:
+        db.close()
+    assert _by_category(client) == incremental
+
+def test_export_keeps_category_and_cost_at_time_of_sale(client, sell):
+    item = client.get("/items/1").json()
+    invoice_id = sell(1)["invoice_id"]
+    assert client.put("/items/1", data={"category": "Recategorised", "purchase_price": item["purchase_price"] + 1}).status_code == 200
+
+    response = client.get("/invoices/export", params={"format": "ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    [line] = [line for line in lines if line["invoice_id"] == invoice_id]
+    assert (line["category"], line["purchase_price"]) == (item["category"], item["purchase_price"])
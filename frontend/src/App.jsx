@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { fetchItems, addItem, updateItem, submitInvoice, fetchSalesTracker, fetchInvoicesByDate, fetchCustomers, addCustomer, updateCustomer, deleteCustomer, fetchCustomerOutstandingBalance, updateInvoicePayment } from './api';
+import { fetchItemsPage, addItem, updateItem, importItems, itemsExportUrl, invoicesExportUrl, submitInvoice, fetchSalesTracker, fetchInvoicesByDate, fetchCustomers, addCustomer, updateCustomer, deleteCustomer, fetchCustomerOutstandingBalance, fetchCustomerBalances, updateInvoicePayment, searchItems, searchCustomers } from './api';
 import { Search, Plus, Edit3, Trash2, Package, Wrench, Droplet, Car, User, Phone, Mail, MapPin } from 'lucide-react';
 import './App.css';
 import Dashboard from './dashboard.jsx';
@@ -229,8 +229,45 @@ function CustomerForm({ onSubmit, onCancel, initial, submitLabel }) {
   );
 }
 
+// Items per /items request when loading the inventory (the server caps pages at 500)
+const ITEMS_PAGE_SIZE = 500;
+
+// Wait this long after the last keystroke before searching on the server
+const SEARCH_DEBOUNCE_MS = 200;
+
+// Debounced server-side search. Returns null while the term is empty so the
+// caller can show its full list; re-runs when the term, params or refreshKey change.
+function useServerSearch(search, term, params, refreshKey) {
+  const [results, setResults] = useState(null);
+  const paramsKey = JSON.stringify(params || {});
+
+  useEffect(() => {
+    const q = term.trim();
+    if (!q) {
+      setResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const found = await search(q, params);
+        if (!cancelled) setResults(found);
+      } catch (error) {
+        console.error('Search failed:', error);
+      }
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [search, term, paramsKey, refreshKey]);
+
+  return results;
+}
+
 function CustomerManagement({ loading }) {
   const [customers, setCustomers] = useState([]);
+  const [balances, setBalances] = useState({});
   const [searchTerm, setSearchTerm] = useState('');
   const [showAdd, setShowAdd] = useState(false);
   const [editCustomer, setEditCustomer] = useState(null);
@@ -243,8 +280,10 @@ function CustomerManagement({ loading }) {
   async function loadCustomers() {
     try {
       setLoadingCustomers(true);
-      const data = await fetchCustomers();
+      // Every customer's stored balance in one request, not one per card
+      const [data, balanceRows] = await Promise.all([fetchCustomers(), fetchCustomerBalances()]);
       setCustomers(data);
+      setBalances(Object.fromEntries(balanceRows.map(b => [b.customer_id, b.outstanding_balance])));
     } catch (error) {
       console.error('Failed to load customers:', error);
       alert('Failed to load customers');
@@ -287,12 +326,9 @@ function CustomerManagement({ loading }) {
     }
   }
 
-  // Filter customers based on search
-  const filteredCustomers = customers.filter(customer => 
-    customer.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    (customer.phone && customer.phone.toLowerCase().includes(searchTerm.toLowerCase())) ||
-    (customer.email && customer.email.toLowerCase().includes(searchTerm.toLowerCase()))
-  );
+  // Ranked server-side search on name, phone and email; the full list when the box is empty
+  const searchResults = useServerSearch(searchCustomers, searchTerm, undefined, customers);
+  const filteredCustomers = searchResults ?? customers;
 
   if (loadingCustomers) {
     return (
@@ -389,6 +425,10 @@ function CustomerManagement({ loading }) {
                   <span className="modern-inventory-detail-value">{customer.address}</span>
                 </div>
               )}
+              <div className="modern-inventory-detail-row">
+                <span className="modern-inventory-detail-label">Outstanding</span>
+                <span className="modern-inventory-detail-value">Rs. {(balances[customer.id] || 0).toLocaleString()}</span>
+              </div>
               <div className="modern-inventory-detail-row">
                 <span className="modern-inventory-detail-label">Joined</span>
                 <span className="modern-inventory-detail-value">
@@ -444,9 +484,10 @@ function CustomerManagement({ loading }) {
   );
 }
 
-function ModernInventoryList({ items, onAddItem, onEditItem, onDeleteItem, loading }) {
+function ModernInventoryList({ items, onAddItem, onEditItem, onDeleteItem, onImported, loading }) {
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedCategory, setSelectedCategory] = useState('All Categories');
+  const [importing, setImporting] = useState(false);
 
   const categories = [
     { name: 'All Categories', icon: Package },
@@ -455,13 +496,29 @@ function ModernInventoryList({ items, onAddItem, onEditItem, onDeleteItem, loadi
     { name: 'Car Accessories', icon: Car }
   ];
 
-  // Filter items based on search and category
-  const filteredItems = items.filter(item => {
-    const matchesSearch = item.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         item.product_code.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesCategory = selectedCategory === 'All Categories' || item.category === selectedCategory;
-    return matchesSearch && matchesCategory;
-  });
+  // Ranked server-side search on code, name and category; the full list when the box is empty
+  const category = selectedCategory === 'All Categories' ? undefined : selectedCategory;
+  const searchResults = useServerSearch(searchItems, searchTerm, { category }, items);
+  const filteredItems = searchResults ?? items.filter(item => !category || item.category === category);
+
+  // Upsert items by product code from a CSV or NDJSON file, then reload the list
+  async function handleImport(e) {
+    const file = e.target.files[0];
+    e.target.value = '';
+    if (!file) return;
+    try {
+      setImporting(true);
+      const result = await importItems(file);
+      const errors = result.errors.map(err => `Row ${err.row} (${err.product_code || 'no code'}): ${err.error}`);
+      alert([`${result.created} created, ${result.updated} updated, ${result.failed} failed`, ...errors].join('\n'));
+      onImported();
+    } catch (error) {
+      console.error('Failed to import items:', error);
+      alert(error.message);
+    } finally {
+      setImporting(false);
+    }
+  }
 
   const getStockStatus = (stock) => {
     if (stock === 0) return { label: 'Out of Stock', color: 'modern-inventory-stock-out' };
@@ -495,6 +552,15 @@ function ModernInventoryList({ items, onAddItem, onEditItem, onDeleteItem, loadi
           <h2 className="modern-inventory-page-title">Inventory Management</h2>
           <p className="modern-inventory-page-description">Track and manage your auto parts stock</p>
         </div>
+        <div style={{ display: 'flex', gap: '0.5rem' }}>
+          <label className="modern-inventory-add-btn">
+            {importing ? 'Importing...' : 'Import'}
+            <input type="file" accept=".csv,.ndjson,.jsonl" onChange={handleImport} disabled={importing} hidden />
+          </label>
+          <a href={itemsExportUrl('csv')} className="modern-inventory-add-btn" style={{ textDecoration: 'none' }} download>
+            Export
+          </a>
+        </div>
       </div>
 
       {/* Search Bar */}
@@ -1463,41 +1529,50 @@ function SalesInvoiceForm({ items = [], onBack, onInvoiceCreated }) {
     </div>
   );
 }
+function monthRange(month) {
+  const [year, mon] = month.split('-').map(Number);
+  const lastDay = new Date(Date.UTC(year, mon, 0)).getUTCDate();
+  return { start: `${month}-01`, end: `${month}-${String(lastDay).padStart(2, '0')}` };
+}
+
 function SalesTrackerTab({ onViewDetails }) {
   const [sales, setSales] = useState([]);
+  const [months, setMonths] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [month, setMonth] = useState('all');
 
   useEffect(() => {
-    fetchSalesTracker()
+    fetchSalesTracker({ group_by: 'month' })
+      .then(rows => setMonths(rows.map(r => r.month).reverse()))
+      .catch(e => setError(e.message));
+  }, []);
+
+  // Buckets of (day, category) totals, aggregated by the backend
+  useEffect(() => {
+    const range = month === 'all' ? {} : monthRange(month);
+    fetchSalesTracker({ ...range, group_by: ['day', 'category'] })
       .then(setSales)
       .catch(e => setError(e.message))
       .finally(() => setLoading(false));
-  }, []);
+  }, [month]);
 
   const grouped = {};
-  sales.forEach(entry => {
-    const date = new Date(entry.date).toISOString().slice(0, 10);
-    if (!grouped[date]) grouped[date] = [];
-    grouped[date].push(entry);
+  sales.forEach(bucket => {
+    if (!grouped[bucket.day]) grouped[bucket.day] = [];
+    grouped[bucket.day].push(bucket);
   });
 
-  const months = Array.from(new Set(sales.map(entry => new Date(entry.date).toISOString().slice(0, 7))));
-
-  const filteredDates = Object.keys(grouped).filter(date => {
-    const monthMatch = month === 'all' || date.slice(0, 7) === month;
-    return monthMatch;
-  });
+  const filteredDates = Object.keys(grouped).sort().reverse();
 
   const totalItems = sales.reduce((sum, e) => sum + e.quantity, 0);
   const totalRevenue = sales.reduce((sum, e) => sum + e.revenue, 0);
-  const activeDays = new Set(sales.map(e => new Date(e.date).toISOString().slice(0, 10))).size;
+  const activeDays = filteredDates.length;
   const itemsPerDay = activeDays ? (totalItems / activeDays).toFixed(1) : 0;
 
   if (loading) return <div className="card">Loading sales tracker...</div>;
   if (error) return <div className="card">Error: {error}</div>;
-  if (sales.length === 0) return <div className="card empty-state"><i className="fas fa-box-open"></i><br/>No sales yet.</div>;
+  if (sales.length === 0 && month === 'all') return <div className="card empty-state"><i className="fas fa-box-open"></i><br/>No sales yet.</div>;
 
   return (
     <div className="modern-inventory-container">
@@ -1507,6 +1582,15 @@ function SalesTrackerTab({ onViewDetails }) {
           <h2 className="modern-inventory-page-title">Sales Tracker</h2>
           <p className="modern-inventory-page-description">Monitor daily sales performance and revenue</p>
         </div>
+        {/* Every invoice line for the selected month, or all months */}
+        <a
+          href={invoicesExportUrl({ ...(month === 'all' ? {} : monthRange(month)), format: 'csv' })}
+          className="modern-inventory-add-btn"
+          style={{ textDecoration: 'none' }}
+          download
+        >
+          Export Invoices
+        </a>
       </div>
 
       {/* Filter Controls */}
@@ -2006,13 +2090,10 @@ function PurchaseManagement({ items, onAddItem, onEditItem, onDeleteItem }) {
     { name: 'Car Accessories', icon: Car }
   ];
 
-  // Filter items based on search and category
-  const filteredItems = items.filter(item => {
-    const matchesSearch = item.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         item.product_code.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesCategory = selectedCategory === 'All Categories' || item.category === selectedCategory;
-    return matchesSearch && matchesCategory;
-  });
+  // Ranked server-side search on code, name and category; the full list when the box is empty
+  const category = selectedCategory === 'All Categories' ? undefined : selectedCategory;
+  const searchResults = useServerSearch(searchItems, searchTerm, { category }, items);
+  const filteredItems = searchResults ?? items.filter(item => !category || item.category === category);
 
   const getStockStatus = (stock) => {
     if (stock === 0) return { label: 'Out of Stock', color: 'modern-inventory-stock-out' };
@@ -2742,8 +2823,16 @@ function App() {
   async function loadItems() {
     try {
       setLoading(true);
-      const data = await fetchItems();
-      setItems(data);
+      // Show the first page straight away, then fill in the rest page by page
+      let page = await fetchItemsPage({ limit: ITEMS_PAGE_SIZE });
+      let loaded = page.items;
+      setItems(loaded);
+      setLoading(false);
+      while (page.nextCursor) {
+        page = await fetchItemsPage({ limit: ITEMS_PAGE_SIZE, after: page.nextCursor });
+        loaded = [...loaded, ...page.items];
+        setItems(loaded);
+      }
     } catch (error) {
       console.error('Failed to load items:', error);
     } finally {
@@ -2929,6 +3018,7 @@ function App() {
                 onAddItem={() => setShowAdd(true)}
                 onEditItem={(item) => setEditItem(item)}
                 onDeleteItem={handleDelete}
+                onImported={loadItems}
               />
             )}
 
@@ -1,10 +1,27 @@
 const API_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
 
-export async function fetchItems() {
-  const res = await fetch(`${API_URL}/items`);
+function queryString(params = {}) {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') query.append(key, value);
+  });
+  const qs = query.toString();
+  return qs ? `?${qs}` : '';
+}
+
+// params: { after, limit, category, low_stock, name_prefix }
+export async function fetchItems(params) {
+  const res = await fetch(`${API_URL}/items${queryString(params)}`);
   return res.json();
 }
 
+// Fetch one page of items; pass the returned nextCursor as `after` for the next page
+export async function fetchItemsPage(params = {}) {
+  const res = await fetch(`${API_URL}/items${queryString({ limit: 100, ...params })}`);
+  if (!res.ok) throw new Error('Failed to fetch items');
+  return { items: await res.json(), nextCursor: res.headers.get('X-Next-Cursor') };
+}
+
 export async function addItem(formData) {
   const res = await fetch(`${API_URL}/items`, {
     method: 'POST',
@@ -21,6 +38,32 @@ export async function updateItem(id, formData) {
   return res.json();
 }
 
+// Upsert items by product_code from a CSV or NDJSON File; returns
+// { created, updated, failed, errors: [{ row, product_code, error }] }
+export async function importItems(file) {
+  const format = /\.(ndjson|jsonl)$/i.test(file.name) ? 'ndjson' : 'csv';
+  const res = await fetch(`${API_URL}/items/import?format=${format}`, {
+    method: 'POST',
+    headers: { 'Content-Type': format === 'ndjson' ? 'application/x-ndjson' : 'text/csv' },
+    body: file,
+  });
+  if (!res.ok) throw new Error((await res.json()).detail || 'Failed to import items');
+  return res.json();
+}
+
+// Download link for all items in the import format ('csv' or 'ndjson')
+export function itemsExportUrl(format = 'csv') {
+  return `${API_URL}/items/export${queryString({ format })}`;
+}
+
+// Ranked search on product code, name and category (prefix, substring or
+// fuzzy); params: { limit, category }
+export async function searchItems(q, params = {}) {
+  const res = await fetch(`${API_URL}/items/search${queryString({ q, ...params })}`);
+  if (!res.ok) throw new Error('Failed to search items');
+  return res.json();
+}
+
 export async function deleteItem(id) {
   const res = await fetch(`${API_URL}/items/${id}`, {
     method: 'DELETE',
@@ -38,25 +81,55 @@ export async function submitInvoice(invoiceData) {
   return res.json();
 }
 
-export async function fetchSalesTracker() {
-  const res = await fetch(`${API_URL}/sales-tracker`);
+// params: { start, end, group_by } -- group_by may be a string or an array of
+// 'day' | 'month' | 'category' | 'product' to get server-side totals per bucket
+export async function fetchSalesTracker(params = {}) {
+  const query = new URLSearchParams();
+  if (params.start) query.append('start', params.start);
+  if (params.end) query.append('end', params.end);
+  [].concat(params.group_by || []).forEach(g => query.append('group_by', g));
+  const qs = query.toString();
+  const res = await fetch(`${API_URL}/sales-tracker${qs ? `?${qs}` : ''}`);
   if (!res.ok) throw new Error('Failed to fetch sales tracker');
   return res.json();
 }
 
-export async function fetchInvoicesByDate(date) {
-  const res = await fetch(`${API_URL}/invoices/by-date?date=${date}`);
+// Pass { compact: true } to get lines with product name/code only
+export async function fetchInvoicesByDate(date, { compact = false } = {}) {
+  const res = await fetch(`${API_URL}/invoices/by-date${queryString({ date, compact: compact || undefined })}`);
   if (!res.ok) throw new Error('Failed to fetch invoices for date');
   return res.json();
 }
 
+// Download link for invoices over a date range.
+// params: { start, end, format: 'csv' | 'ndjson', lines: false for one row per invoice }
+export function invoicesExportUrl(params = {}) {
+  return `${API_URL}/invoices/export${queryString(params)}`;
+}
+
+// Dashboard KPIs, low-stock items and latest invoices in one request.
+// params: { recent, low_stock, low_stock_items }
+export async function fetchDashboardSummary(params = {}) {
+  const res = await fetch(`${API_URL}/dashboard/summary${queryString(params)}`);
+  if (!res.ok) throw new Error('Failed to fetch dashboard summary');
+  return res.json();
+}
+
 // Customer API functions
-export async function fetchCustomers() {
-  const res = await fetch(`${API_URL}/customers`);
+// params: { after, limit, name_prefix }
+export async function fetchCustomers(params) {
+  const res = await fetch(`${API_URL}/customers${queryString(params)}`);
   if (!res.ok) throw new Error('Failed to fetch customers');
   return res.json();
 }
 
+// Ranked search on customer name, phone and email; params: { limit }
+export async function searchCustomers(q, params = {}) {
+  const res = await fetch(`${API_URL}/customers/search${queryString({ q, ...params })}`);
+  if (!res.ok) throw new Error('Failed to search customers');
+  return res.json();
+}
+
 export async function addCustomer(customerData) {
   const res = await fetch(`${API_URL}/customers`, {
     method: 'POST',
@@ -91,6 +164,13 @@ export async function fetchCustomerOutstandingBalance(customerId) {
   return res.json();
 }
 
+// All regular customers' balances in one request: [{ customer_id, outstanding_balance }]
+export async function fetchCustomerBalances() {
+  const res = await fetch(`${API_URL}/customers/balances`);
+  if (!res.ok) throw new Error('Failed to fetch customer balances');
+  return res.json();
+}
+
 export async function updateInvoicePayment(invoiceId, amountPaid) {
   const res = await fetch(`${API_URL}/invoices/${invoiceId}/payment`, {
     method: 'PUT',
@@ -1,9 +1,12 @@
 // Dashboard.jsx - Using your existing CSS classes
 import React, { useState, useEffect } from 'react';
-import { fetchItems, fetchSalesTracker, fetchInvoicesByDate } from './api';
+import { fetchDashboardSummary } from './api';
 import { Wrench, Droplet, Car, Package } from 'lucide-react';
 import './App.css';
 
+// Items at or below this quantity count as low stock
+const LOW_STOCK_THRESHOLD = 5;
+
 function Dashboard({ onNavigate }) {
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [dashboardData, setDashboardData] = useState({
@@ -46,110 +49,32 @@ function Dashboard({ onNavigate }) {
       setDashboardData(prev => ({ ...prev, loading: true, error: null }));
       setLastLoadTime(currentTime);
       
-      // Fetch all required data with error handling
-      let items = [];
-      let salesData = [];
-      
-      try {
-        const [itemsResponse, salesResponse] = await Promise.all([
-          fetchItems(),
-          fetchSalesTracker()
-        ]);
-        
-        items = itemsResponse || [];
-        salesData = salesResponse || [];
-        
-        console.log('Items:', items);
-        console.log('Sales Data:', salesData);
-      } catch (fetchError) {
-        console.error('Error fetching data:', fetchError);
-        // Continue with empty arrays if fetch fails
-        items = [];
-        salesData = [];
-      }
-
-      // Calculate total inventory (default to 0 if no items)
-      const totalInventory = items.length > 0 
-        ? items.reduce((sum, item) => sum + (parseInt(item.quantity) || 0), 0)
-        : 0;
-
-      // Calculate low stock items (items with quantity <= 5, default to 0)
-      const lowStockItems = items.length > 0
-        ? items.filter(item => (parseInt(item.quantity) || 0) <= 5).length
-        : 0;
-
-      // Get today's date
-      const today = new Date().toISOString().slice(0, 10);
-      
-      // Calculate today's sales (default to 0 if no sales data)
-      let todaysSales = 0;
-      if (salesData.length > 0) {
-        const todaysSalesData = salesData.filter(sale => {
-          const saleDate = new Date(sale.date).toISOString().slice(0, 10);
-          return saleDate === today;
-        });
-        todaysSales = todaysSalesData.reduce((sum, sale) => sum + (parseFloat(sale.revenue) || 0), 0);
-      }
-
-      // Calculate monthly revenue (current month, default to 0 if no sales data)
-      let monthlyRevenue = 0;
-      if (salesData.length > 0) {
-        const currentMonth = new Date().toISOString().slice(0, 7); // YYYY-MM
-        const monthlySalesData = salesData.filter(sale => {
-          const saleMonth = new Date(sale.date).toISOString().slice(0, 7);
-          return saleMonth === currentMonth;
-        });
-        monthlyRevenue = monthlySalesData.reduce((sum, sale) => sum + (parseFloat(sale.revenue) || 0), 0);
-      }
-
-      // Calculate trends
-      let inventoryTrend = 0;
-      let salesTrend = 0;
-      let revenueTrend = 0;
-
-      // Calculate inventory trend (compare with previous month)
-      if (items.length > 0) {
-        // For now, we'll simulate inventory trend based on current vs previous data
-        // In a real scenario, you'd fetch historical inventory data
-        const previousInventory = Math.floor(totalInventory * 0.88); // Simulate 12% increase
-        inventoryTrend = previousInventory > 0 ? ((totalInventory - previousInventory) / previousInventory) * 100 : 0;
-      }
-
-      // Calculate sales trend (compare today with yesterday)
-      if (salesData.length > 0) {
-        const yesterday = new Date();
-        yesterday.setDate(yesterday.getDate() - 1);
-        const yesterdayStr = yesterday.toISOString().slice(0, 10);
-        
-        const yesterdaySalesData = salesData.filter(sale => {
-          const saleDate = new Date(sale.date).toISOString().slice(0, 10);
-          return saleDate === yesterdayStr;
-        });
-        const yesterdaySales = yesterdaySalesData.reduce((sum, sale) => sum + (parseFloat(sale.revenue) || 0), 0);
-        
-        salesTrend = yesterdaySales > 0 ? ((todaysSales - yesterdaySales) / yesterdaySales) * 100 : 0;
-      }
-
-      // Calculate revenue trend (compare current month with previous month)
-      if (salesData.length > 0) {
-        const currentDate = new Date();
-        const previousMonth = new Date(currentDate.getFullYear(), currentDate.getMonth() - 1, 1);
-        const previousMonthStr = previousMonth.toISOString().slice(0, 7);
-        
-        const previousMonthSalesData = salesData.filter(sale => {
-          const saleMonth = new Date(sale.date).toISOString().slice(0, 7);
-          return saleMonth === previousMonthStr;
-        });
-        const previousMonthRevenue = previousMonthSalesData.reduce((sum, sale) => sum + (parseFloat(sale.revenue) || 0), 0);
-        
-        revenueTrend = previousMonthRevenue > 0 ? ((monthlyRevenue - previousMonthRevenue) / previousMonthRevenue) * 100 : 0;
-      }
-
-      // Skip recent sales for faster loading - can be loaded separately if needed
-      const recentSales = [];
+      // KPIs, low-stock items and the latest invoices, computed server-side in one request
+      const summary = await fetchDashboardSummary({ recent: 5, low_stock: LOW_STOCK_THRESHOLD, low_stock_items: 20 });
+
+      const totalInventory = summary.stock_units;
+      const lowStockItems = summary.low_stock_count;
+      const todaysSales = summary.today.revenue;
+      const monthlyRevenue = summary.month.revenue;
+
+      // Inventory trend is simulated until historical stock levels are tracked
+      const previousInventory = Math.floor(totalInventory * 0.88);
+      const inventoryTrend = previousInventory > 0 ? ((totalInventory - previousInventory) / previousInventory) * 100 : 0;
+      // Today against yesterday, and this month so far against all of last month
+      const yesterdaySales = summary.yesterday.revenue;
+      const salesTrend = yesterdaySales > 0 ? ((todaysSales - yesterdaySales) / yesterdaySales) * 100 : 0;
+      const previousMonthRevenue = summary.previous_month.revenue;
+      const revenueTrend = previousMonthRevenue > 0 ? ((monthlyRevenue - previousMonthRevenue) / previousMonthRevenue) * 100 : 0;
+
+      // Timestamps are UTC without a zone suffix
+      const recentSales = summary.recent_invoices.map(invoice => ({
+        id: invoice.id,
+        clientName: invoice.client_name || 'Unknown Client',
+        amount: invoice.total_amount || 0,
+        time: new Date(invoice.created_at.replace('Z', '').replace('+00:00', '') + 'Z')
+      }));
 
-      // Set low stock items list (quantity < 10)
-      setLowStockItemsList(items.filter(item => (parseInt(item.quantity) || 0) < 10));
+      setLowStockItemsList(summary.low_stock_items);
 
       setDashboardData({
         totalInventory: totalInventory || 0,
@@ -173,92 +98,6 @@ function Dashboard({ onNavigate }) {
     }
   };
 
-  const getRecentSales = async () => {
-    try {
-      const recentDates = [];
-      for (let i = 0; i < 5; i++) {
-        const date = new Date();
-        date.setDate(date.getDate() - i);
-        recentDates.push(date.toISOString().slice(0, 10));
-      }
-
-      // Fetch all dates in parallel for better performance
-      const invoicePromises = recentDates.map(async (date) => {
-        try {
-          const invoices = await fetchInvoicesByDate(date);
-          return invoices && Array.isArray(invoices) ? invoices : [];
-        } catch (error) {
-          console.log(`No invoices found for ${date}`);
-          return [];
-        }
-      });
-
-      const invoiceArrays = await Promise.all(invoicePromises);
-      const allInvoices = invoiceArrays.flat();
-
-      return allInvoices
-        .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-        .slice(0, 5)
-        .map(invoice => {
-          // Debug logging to see what we're getting
-          console.log('Invoice data:', invoice);
-          console.log('Created at:', invoice.created_at);
-          
-          let invoiceTime;
-          if (invoice.created_at) {
-            // Try to parse the date properly
-            try {
-              // Handle different date formats that might come from the API
-              let dateString = invoice.created_at;
-              
-              // If it's already a string, use it directly
-              if (typeof dateString === 'string') {
-                // Remove any timezone info and parse as UTC
-                dateString = dateString.replace('Z', '').replace('+00:00', '');
-                invoiceTime = new Date(dateString + 'Z'); // Add Z to make it UTC
-              } else {
-                // If it's already a Date object or timestamp
-                invoiceTime = new Date(dateString);
-              }
-              
-              // Check if the date is valid
-              if (isNaN(invoiceTime.getTime())) {
-                console.warn('Invalid date for invoice:', invoice.id, invoice.created_at);
-                // Try to create a date from the current date minus some hours to simulate real data
-                const now = new Date();
-                now.setHours(now.getHours() - Math.floor(Math.random() * 24)); // Random time within last 24 hours
-                invoiceTime = now;
-              }
-            } catch (error) {
-              console.error('Error parsing date for invoice:', invoice.id, error);
-              // Create a realistic fallback time
-              const now = new Date();
-              now.setHours(now.getHours() - Math.floor(Math.random() * 24)); // Random time within last 24 hours
-              invoiceTime = now;
-            }
-          } else {
-            console.warn('No created_at field for invoice:', invoice.id);
-            // Create a realistic fallback time
-            const now = new Date();
-            now.setHours(now.getHours() - Math.floor(Math.random() * 24)); // Random time within last 24 hours
-            invoiceTime = now;
-          }
-          
-          return {
-            id: invoice.id || 0,
-            clientName: invoice.client_name || 'Unknown Client',
-            amount: invoice.items && Array.isArray(invoice.items) 
-              ? invoice.items.reduce((sum, item) => sum + ((parseFloat(item.price) || 0) * (parseInt(item.quantity) || 0)), 0) 
-              : 0,
-            time: invoiceTime
-          };
-        });
-    } catch (error) {
-      console.error('Error fetching recent sales:', error);
-      return [];
-    }
-  };
-
   const formatCurrency = (amount) => {
     return `Rs. ${amount.toLocaleString()}`;
   };